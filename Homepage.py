@@ -1,9 +1,10 @@
 import streamlit as st
-import json
-import os
 from collections import deque
-from solve import solve
-from generate import generate
+import service_client
+import tutor_service
+import image_assets
+import session_manager
+import related_questions
 
 
 # Initialize session state
@@ -15,19 +16,33 @@ if 'checked_questions' not in st.session_state:
     st.session_state.checked_questions = set()
 if 'language' not in st.session_state:
     st.session_state.language = "Hindi"  # Changed default to Hindi
-if 'data' not in st.session_state:
-    st.session_state.data = None
+if 'chapter' not in st.session_state:
+    st.session_state.chapter = None  # (language, chapter number); the parsed chapter is shared across sessions
+if 'question_figures' not in st.session_state:
+    st.session_state.question_figures = {}
 
 # Function to handle checkbox changes
-def update_question(question, is_checked):
+def update_question(question, is_checked, figure=None):
     if is_checked:
         if question not in st.session_state.question_queue:
             st.session_state.question_queue.append(question)
         st.session_state.checked_questions.add(question)
+        if figure:
+            st.session_state.question_figures[question] = figure
     else:
         if question in st.session_state.question_queue:
             st.session_state.question_queue.remove(question)
         st.session_state.checked_questions.discard(question)
+        st.session_state.question_figures.pop(question, None)
+
+# Function to show a question's figure
+def show_figure(figure, label, key):
+    thumbnail = image_assets.thumbnail_path(figure)
+    if thumbnail is None:
+        st.caption(f"{label} (figure not available)")
+    # Thumbnails are only sent to the browser once asked for
+    elif st.toggle(f"Show {label}", key=key):
+        st.image(thumbnail, caption=label)
 
 # Main page
 def main_page():
@@ -62,25 +77,19 @@ def main_page():
     submit_button = st.sidebar.button("Submit")
 
     if submit_button:
-        if st.session_state.language == "English":
-            json_path = f"Class10English/engChapter{chapter}.json"
-        else:
-            json_path = f"Class10Hindi/hindichapter{chapter}.json"
-        
-        if os.path.exists(json_path):
-            with open(json_path, 'r') as file:
-                st.session_state.data = json.load(file)
-        else:
+        st.session_state.chapter = (st.session_state.language, chapter)
+        if service_client.load_chapter(*st.session_state.chapter) is None:
             st.error(f"No data found for Chapter {chapter} in {st.session_state.language} language.")
-            st.session_state.data = None
+            st.session_state.chapter = None
     
-    if st.session_state.data:
+    data = service_client.load_chapter(*st.session_state.chapter) if st.session_state.chapter else None
+    if data:
         # List of exercises in the selected chapter
-        exercises = [exercise["exercise"] for exercise in st.session_state.data["exercises"]]
+        exercises = [exercise["exercise"] for exercise in data["exercises"]]
         exercise_selected = st.sidebar.selectbox("Select an exercise", exercises)
 
         # Find the corresponding exercise questions
-        for exercise in st.session_state.data["exercises"]:
+        for exercise in data["exercises"]:
             if exercise["exercise"] == exercise_selected:
                 questions = exercise["questions"]
                 break
@@ -88,26 +97,44 @@ def main_page():
         # Display the questions interactively with checkboxes
         st.header(f"Exercise {exercise_selected} Questions")
         for i, question in enumerate(questions):
-            question_text = f"Question {i + 1}: {question['question']}"
+            question_text = tutor_service.question_text(i, question)
+            figure = None
+            if "image" in question:
+                figure = image_assets.figure_key(st.session_state.chapter[0], question["image"])
+                show_figure(figure, question["image"], f"figure_{i}")
             if "sub_questions" in question:
-                for sub_i, sub_question in enumerate(question["sub_questions"]):
-                    full_question_text = f"{question_text} {i + 1}.{sub_i + 1} {sub_question}"
+                for sub_i in range(len(question["sub_questions"])):
+                    full_question_text = tutor_service.question_text(i, question, sub_i)
                     is_checked = st.checkbox(
                         full_question_text,
                         value=full_question_text in st.session_state.checked_questions,
                         key=f"checkbox_{i}_{sub_i}"
                     )
-                    update_question(full_question_text, is_checked)
-            if "image"in question:
-                 # give logic
-                 print("hi")
-            else:
-                is_checked = st.checkbox(
-                    question_text,
-                    value=question_text in st.session_state.checked_questions,
-                    key=f"checkbox_{i}"
-                )
-                update_question(question_text, is_checked)
+                    update_question(full_question_text, is_checked, figure)
+            is_checked = st.checkbox(
+                question_text,
+                value=question_text in st.session_state.checked_questions,
+                key=f"checkbox_{i}"
+            )
+            update_question(question_text, is_checked, figure)
+
+        # Suggest matching textbook questions from other exercises
+        if st.session_state.question_queue:
+            language, chapter_number = st.session_state.chapter
+            suggestions = [
+                item for item in related_questions.related(st.session_state.question_queue, limit=8, min_score=0.15)
+                if (item["language"], item["chapter"], item["exercise"]) != (language, chapter_number, exercise_selected)
+            ][:5]
+            if suggestions:
+                st.subheader("Related Questions")
+                for n, item in enumerate(suggestions):
+                    col1, col2 = st.columns([5, 1])
+                    col1.write(item["text"])
+                    col1.caption(f"{item['language']} · Chapter {item['chapter']} · Exercise {item['exercise']}")
+                    if col2.button("Add", key=f"related_{n}"):
+                        update_question(item["text"], True, item["figure"])
+                        st.rerun()
+
         # Display the selected questions queue
         st.sidebar.subheader("Selected Questions Queue")
         if st.session_state.question_queue:
@@ -118,6 +145,7 @@ def main_page():
         if st.sidebar.button("Clear Selected Questions", key="clear_selected"):
             st.session_state.question_queue.clear()
             st.session_state.checked_questions.clear()
+            st.session_state.question_figures.clear()
             st.sidebar.success("Selected questions cleared!")
             st.rerun()
         else:
@@ -125,15 +153,21 @@ def main_page():
 
         # Add "Solve" and "Generate More" buttons
         if st.sidebar.button("Solve", key="solve_button"):
+            session_manager.forget('solve_answer')
+            session_manager.forget('solve_pdf')
             st.session_state.page = 'solve'
             st.rerun()
         if st.sidebar.button("Generate More", key="generate_button"):
+            session_manager.forget('worksheet')
+            session_manager.forget('worksheet_pdf')
             st.session_state.page = 'generate'
             st.rerun()
 
 # Solve page
 def solve_page():
     st.title("Solve")
+    # Imported on first use so the chapter browser starts without them
+    from solve import solve
     solve()
     if st.button("Back", key="back_solve"):
         st.session_state.page = 'main'
@@ -142,6 +176,7 @@ def solve_page():
 # Generate More page
 def generate_page():
     st.title("Generate More Questions")
+    from generate import generate
     generate()
     if st.button("Back", key="back_generate"):
         st.session_state.page = 'main'
@@ -0,0 +1,125 @@
+"""
+Builds the figure assets used by question images.
+
+For every question with an `image` key in the chapter files, finds its source
+under assets/source/ (see image_assets.source_names for the naming rules)
+and writes two variants under assets/build/ with content-hashed names:
+
+- a thumbnail bounded to THUMB_SIZE for the question list
+- a compressed PNG bounded to FULL_SIZE for prompts and PDFs
+
+The manifest maps "<language>/<label>" to the built files. Run it whenever
+figures or chapters change:
+
+    python build_assets.py
+"""
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+
+from PIL import Image
+
+import image_assets
+from tutor_service import BASE_DIR, CHAPTER_PATHS
+
+THUMB_SIZE = (240, 240)
+FULL_SIZE = (1024, 1024)
+
+
+def chapter_figures():
+    """Yields (language, label) for every figure referenced by the chapter files."""
+    seen = set()
+    for language, template in CHAPTER_PATHS.items():
+        for json_path in sorted(glob.glob(os.path.join(BASE_DIR, template.format(chapter="*")))):
+            with open(json_path, 'r') as file:
+                data = json.load(file)
+            for exercise in data.get("exercises", []):
+                for question in exercise.get("questions", []):
+                    label = question.get("image")
+                    if label and (language, label) not in seen:
+                        seen.add((language, label))
+                        yield language, label
+
+
+def encode_variant(image: Image.Image, size, fmt: str, **save_args) -> bytes:
+    """Resizes a copy of the image to fit within size and encodes it."""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, format=fmt, **save_args)
+    return buffer.getvalue()
+
+
+def write_hashed(content: bytes, extension: str) -> str:
+    """Writes content under its hash and returns the file name."""
+    file_name = f"{hashlib.sha256(content).hexdigest()[:16]}{extension}"
+    path = os.path.join(image_assets.BUILD_DIR, file_name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as file:
+            file.write(content)
+    return file_name
+
+
+def build_figure(source_path: str, label: str) -> dict:
+    """Builds the thumbnail and compressed variants of one figure and returns its manifest entry."""
+    with Image.open(source_path) as source:
+        # Diagrams are mostly line art on white; flatten transparency so both variants stay small
+        image = source.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+
+    full = encode_variant(background, FULL_SIZE, "PNG", optimize=True)
+    thumb = encode_variant(background, THUMB_SIZE, "WEBP", quality=80, method=6)
+    with Image.open(io.BytesIO(full)) as built:
+        width, height = built.size
+
+    return {
+        "label": label,
+        "full": write_hashed(full, ".png"),
+        "thumb": write_hashed(thumb, ".webp"),
+        "width": width,
+        "height": height
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build thumbnails and compressed figures for question images")
+    parser.add_argument("--strict", action="store_true", help="Fail if any referenced figure has no source image")
+    parser.add_argument("--prune", action="store_true", help="Delete built files no longer in the manifest")
+    args = parser.parse_args()
+
+    os.makedirs(image_assets.BUILD_DIR, exist_ok=True)
+
+    manifest = {}
+    missing = []
+    for language, label in chapter_figures():
+        source_path = image_assets.find_source(language, label)
+        if source_path is None:
+            missing.append(image_assets.figure_key(language, label))
+            continue
+        manifest[image_assets.figure_key(language, label)] = build_figure(source_path, label)
+
+    with open(image_assets.MANIFEST_PATH, 'w') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+    if args.prune:
+        referenced = {name for figure in manifest.values() for name in (figure["full"], figure["thumb"])}
+        referenced.add(os.path.basename(image_assets.MANIFEST_PATH))
+        for name in os.listdir(image_assets.BUILD_DIR):
+            if name not in referenced:
+                os.remove(os.path.join(image_assets.BUILD_DIR, name))
+
+    print(f"Built {len(manifest)} figures into {image_assets.BUILD_DIR}")
+    if missing:
+        print(f"No source image for {len(missing)} figures:", file=sys.stderr)
+        for key in missing:
+            print(f"  {key}", file=sys.stderr)
+    return 1 if missing and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
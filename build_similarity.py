@@ -0,0 +1,146 @@
+"""
+Precomputes related-question neighbours for the textbook corpus.
+
+Every question and sub-question in Class10English and Class10Hindi is turned
+into a TF-IDF vector over hashed word unigrams, word bigrams and character
+trigrams, so no vocabulary needs to be stored. The top-k cosine neighbours
+of each item are written to similarity/neighbours.npz, and the items
+themselves to similarity/items.json. Sub-questions of the same question are
+not suggested for each other.
+
+Run it whenever the chapter files change:
+
+    python build_similarity.py
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+
+import image_assets
+import related_questions
+from tutor_service import BASE_DIR, CHAPTER_PATHS, question_text
+
+TOKEN_PATTERN = re.compile(r'[\w\u0900-\u097F]+')
+QUESTION_PREFIX = re.compile(r'^Question \d+:\s*')
+
+
+def chapter_number(json_path: str) -> int:
+    return int(re.search(r'(\d+)\.json$', json_path).group(1))
+
+
+def corpus_items():
+    """
+    Yields one item per selectable question and sub-question.
+
+    Each item carries the text the main page selects it by, where it comes
+    from, and the text used for vectorising (with the question number
+    removed, and sub-questions including their parent question).
+    """
+    for language, template in CHAPTER_PATHS.items():
+        paths = glob.glob(os.path.join(BASE_DIR, template.format(chapter="*")))
+        for json_path in sorted(paths, key=chapter_number):
+            with open(json_path, 'r') as file:
+                data = json.load(file)
+            for exercise in data.get("exercises", []):
+                for i, question in enumerate(exercise.get("questions", [])):
+                    group = f"{language}/{chapter_number(json_path)}/{exercise['exercise']}/{i}"
+                    base = {
+                        "language": language,
+                        "chapter": chapter_number(json_path),
+                        "exercise": exercise["exercise"],
+                        "figure": image_assets.figure_key(language, question["image"]) if "image" in question else None,
+                    }
+                    for sub_i, sub_question in enumerate(question.get("sub_questions", [])):
+                        yield dict(base, text=question_text(i, question, sub_i), group=group,
+                                   content=f"{question['question']} {sub_question}")
+                    yield dict(base, text=question_text(i, question), group=group,
+                               content=question["question"])
+
+
+def features(text: str):
+    """Returns the word unigrams, word bigrams and character trigrams of a text."""
+    words = TOKEN_PATTERN.findall(QUESTION_PREFIX.sub("", text).lower())
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        grams += [f"c:{padded[j:j + 3]}" for j in range(len(padded) - 2)]
+    return grams
+
+
+def vectorise(texts, n_features: int) -> np.ndarray:
+    """
+    Builds L2-normalised TF-IDF vectors over hashed features.
+
+    A second hash bit picks the sign of each feature so collisions tend to
+    cancel out rather than add up.
+    """
+    counts = np.zeros((len(texts), n_features), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for gram in features(text):
+            hashed = zlib.crc32(gram.encode("utf-8"))
+            counts[row, hashed % n_features] += 1.0 if (hashed >> 31) & 1 else -1.0
+
+    tf = np.sign(counts) * np.log1p(np.abs(counts))
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+    vectors = (tf * idf).astype(np.float32)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_neighbours(vectors: np.ndarray, groups, k: int, chunk: int = 512):
+    """Returns (indices, scores) of each row's k most similar rows outside its own group."""
+    n = len(vectors)
+    k = min(k, n - 1)
+    group_ids = np.unique(np.array(groups), return_inverse=True)[1]
+    neighbours = np.zeros((n, k), dtype=np.uint16 if n <= np.iinfo(np.uint16).max else np.uint32)
+    scores = np.zeros((n, k), dtype=np.float16)
+
+    for start in range(0, n, chunk):
+        similarity = vectors[start:start + chunk] @ vectors.T
+        same_group = group_ids[start:start + chunk, None] == group_ids[None, :]
+        similarity[same_group] = -np.inf
+
+        candidates = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(similarity, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        neighbours[start:start + chunk] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:start + chunk] = np.maximum(np.take_along_axis(candidate_scores, order, axis=1), 0)
+    return neighbours, scores
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompute related-question neighbours")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours stored per question")
+    parser.add_argument("--features", type=int, default=2 ** 14, help="Hashed feature dimensions")
+    args = parser.parse_args()
+
+    items = list(corpus_items())
+    vectors = vectorise([item["content"] for item in items], args.features)
+    neighbours, scores = top_neighbours(vectors, [item["group"] for item in items], args.k)
+
+    os.makedirs(related_questions.SIMILARITY_DIR, exist_ok=True)
+    np.savez_compressed(related_questions.NEIGHBOURS_PATH, neighbours=neighbours, scores=scores)
+    with open(related_questions.ITEMS_PATH, 'w') as file:
+        json.dump(
+            [{key: item[key] for key in ("text", "language", "chapter", "exercise", "group", "figure")} for item in items],
+            file,
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+
+    print(f"Stored {neighbours.shape[1]} neighbours for {len(items)} questions in {related_questions.SIMILARITY_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
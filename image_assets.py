@@ -0,0 +1,117 @@
+"""
+Figures for questions that carry an `image` key.
+
+Source images live under assets/source/ and are processed ahead of time by
+build_assets.py into size-bounded, content-hashed variants under
+assets/build/, described by assets/build/manifest.json. At runtime nothing is
+resized or re-encoded: pages show the precomputed thumbnail, PDFs embed the
+compressed variant by file name, and prompts reuse a per-process cached
+data URL of that variant.
+"""
+import base64
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_ROOT = os.environ.get("ASSET_ROOT", os.path.join(BASE_DIR, "assets"))
+SOURCE_DIR = os.path.join(ASSET_ROOT, "source")
+BUILD_DIR = os.path.join(ASSET_ROOT, "build")
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+
+def figure_key(language: str, label: str) -> str:
+    """Returns the manifest key for a figure label in a chapter language."""
+    return f"{language}/{label}"
+
+
+def source_names(label: str) -> List[str]:
+    """
+    Returns candidate source file names for a figure label.
+
+    Labels in the chapter files come as file names ("Fig_10.11.png") or as
+    captions ("Figure 6.8", "Fig. 12.10"); captions map to "Fig_6.8.<ext>".
+    """
+    label = label.strip()
+    if label.lower().endswith(SOURCE_EXTENSIONS):
+        return [label]
+    match = re.search(r'(\d+(?:\.\d+)*)\s*$', label)
+    stem = f"Fig_{match.group(1)}" if match else re.sub(r'\W+', '_', label).strip('_')
+    return [stem + extension for extension in SOURCE_EXTENSIONS]
+
+
+def find_source(language: str, label: str) -> Optional[str]:
+    """Finds the source image for a figure, preferring a language-specific copy."""
+    for directory in (os.path.join(SOURCE_DIR, language), SOURCE_DIR):
+        for name in source_names(label):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> Dict[str, dict]:
+    """Loads the asset manifest written by build_assets.py, or an empty one."""
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, 'r') as file:
+        return json.load(file)
+
+
+def resolve_figure(key: str) -> Optional[dict]:
+    """
+    Looks up the built variants of a figure.
+
+    Returns:
+        Dict with "label", "thumb", "full", "width" and "height", or None if
+        the figure has not been built
+    """
+    return load_manifest().get(key)
+
+
+def thumbnail_path(key: str) -> Optional[str]:
+    """Returns the path of the figure's thumbnail, if built."""
+    figure = resolve_figure(key)
+    return os.path.join(BUILD_DIR, figure["thumb"]) if figure else None
+
+
+@lru_cache(maxsize=128)
+def _data_url(file_name: str) -> str:
+    # Built file names are content hashes, so the encoding can be cached for the process lifetime
+    with open(os.path.join(BUILD_DIR, file_name), 'rb') as file:
+        encoded = base64.b64encode(file.read()).decode("ascii")
+    return f"data:image/png;base64,{encoded}"
+
+
+def figure_data_url(key: str) -> Optional[str]:
+    """Returns the compressed variant of a figure as a data URL for prompts."""
+    figure = resolve_figure(key)
+    return _data_url(figure["full"]) if figure else None
+
+
+def figure_markdown(key: str) -> str:
+    """
+    Returns markdown embedding the compressed variant of a figure.
+
+    The image is referenced by file name, so PDFs must be rendered with
+    pdf_root() as their root.
+    """
+    figure = resolve_figure(key)
+    if not figure:
+        return ""
+    return f"\n\n![{figure['label']}]({figure['full']})\n"
+
+
+def pdf_root() -> str:
+    """
+    Returns the root directory for rendering PDFs that may embed figures.
+
+    assets/build/ only exists once build_assets.py has run; until then no
+    figure markdown is emitted, so the working directory serves as root.
+    """
+    return BUILD_DIR if os.path.isdir(BUILD_DIR) else "."
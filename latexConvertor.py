@@ -1,4 +1,3 @@
-from pylatexenc.latex2text import LatexNodes2Text
 import re
 
 def convert_superscript(text):
@@ -32,7 +31,8 @@ def convert_latex_document(content):
     Returns:
         str: Converted text with mathematical symbols and proper superscripts
     """
-    # Create converter instance
+    # Create converter instance (pylatexenc is only loaded when a document is converted)
+    from pylatexenc.latex2text import LatexNodes2Text
     converter = LatexNodes2Text()
     
     # Function to handle math mode conversions
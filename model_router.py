@@ -0,0 +1,236 @@
+"""
+Chooses which model serves a completion and falls back to another one on
+timeout or error.
+
+Routes are keyed by task, question type and difficulty. Simple requests
+("Same Level" True/False or Fill in the Blanks variations with a short
+prompt) go to the small model; everything else goes to the large one. When
+both models are eligible for a route, the one with the lower observed
+latency on that route is tried first. A model that keeps failing is tried
+last; every MODEL_RETRY_SECONDS one request probes it in its usual place,
+and a success restores it. Every call records its latency, outcome and
+quality check per route and model; route_stats() returns a snapshot.
+Statistics are kept per process.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SMALL_MODEL = os.environ.get("SMALL_MODEL", "gpt-4o-mini")
+LARGE_MODEL = os.environ.get("LARGE_MODEL", "gpt-4o")
+
+# Per-attempt timeouts in seconds
+MODEL_TIMEOUTS = {
+    SMALL_MODEL: float(os.environ.get("SMALL_MODEL_TIMEOUT", 60)),
+    LARGE_MODEL: float(os.environ.get("LARGE_MODEL_TIMEOUT", 120)),
+}
+
+# Question types and difficulties the small model handles well
+SIMPLE_QUESTION_TYPES = {"True/False", "Fill in the Blanks"}
+SIMPLE_DIFFICULTIES = {"Same Level", "समान स्तर"}
+
+# Prompts estimated above this many tokens always go to the large model
+SMALL_MODEL_MAX_PROMPT_TOKENS = int(os.environ.get("SMALL_MODEL_MAX_PROMPT_TOKENS", 1500))
+
+# Rough token cost of an attached image
+IMAGE_TOKENS = 765
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.2
+
+# Samples needed before observed latency reorders models
+MIN_LATENCY_SAMPLES = 5
+
+# Models failing more often than this are tried last
+MAX_ERROR_RATE = 0.5
+
+# Seconds before a failing model is probed again
+MODEL_RETRY_SECONDS = float(os.environ.get("MODEL_RETRY_SECONDS", 60))
+
+_lock = threading.Lock()
+_route_stats: Dict[str, Dict[str, dict]] = {}
+_model_stats: Dict[str, dict] = {}
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Estimates the prompt size of chat messages, at about four characters per token."""
+    tokens = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            tokens += len(content) // 4
+            continue
+        for part in content:
+            if part.get("type") == "text":
+                tokens += len(part["text"]) // 4
+            else:
+                tokens += IMAGE_TOKENS
+    return tokens
+
+
+def route_key(task: str, question_type: Optional[str] = None, difficulty: Optional[str] = None) -> str:
+    """Returns the name statistics are recorded under for a route."""
+    return " | ".join(part for part in (task, question_type, difficulty) if part)
+
+
+def _ewma(previous: Optional[float], sample: float) -> float:
+    return sample if previous is None else (1 - EWMA_ALPHA) * previous + EWMA_ALPHA * sample
+
+
+def choose_models(task: str, question_type: Optional[str] = None, difficulty: Optional[str] = None,
+                  prompt_tokens: int = 0) -> List[str]:
+    """
+    Returns the models to try for a request, in order. Later models are fallbacks.
+
+    Args:
+        task: "solve" or "generate"
+        question_type: Key of QUESTION_TYPE_MAP, for generate requests
+        difficulty: Difficulty label in either language, for generate requests
+        prompt_tokens: Estimated prompt size
+    """
+    simple = (
+        task == "generate"
+        and question_type in SIMPLE_QUESTION_TYPES
+        and difficulty in SIMPLE_DIFFICULTIES
+        and prompt_tokens <= SMALL_MODEL_MAX_PROMPT_TOKENS
+    )
+    models = [SMALL_MODEL, LARGE_MODEL] if simple else [LARGE_MODEL, SMALL_MODEL]
+
+    route = route_key(task, question_type, difficulty)
+    now = time.monotonic()
+    with _lock:
+        route_latency = {
+            model: _route_stats.get(route, {}).get(model, {}) for model in models
+        }
+        if simple and all(
+            stats.get("calls", 0) - stats.get("errors", 0) >= MIN_LATENCY_SAMPLES for stats in route_latency.values()
+        ):
+            # Either model is good enough for this route, so prefer the one that is faster on it
+            models.sort(key=lambda model: route_latency[model]["latency_ewma"])
+
+        demoted = set()
+        for model in models:
+            stats = _model_stats.get(model)
+            if not stats or stats["error_ewma"] <= MAX_ERROR_RATE:
+                continue
+            if model == models[0] and now - stats["last_attempt"] >= MODEL_RETRY_SECONDS:
+                # Let this request probe the failing model; others keep avoiding it meanwhile
+                stats["last_attempt"] = now
+            else:
+                demoted.add(model)
+
+    # Try models that are currently failing last
+    models.sort(key=lambda model: model in demoted)
+    return models
+
+
+def check_quality(task: str, content: Optional[str]) -> bool:
+    """
+    Cheap structural check of a completion.
+
+    Solutions must state a final answer; generated variations must contain
+    both the questions and the answers section.
+    """
+    if not content or not content.strip():
+        return False
+    if task == "solve":
+        return "Final Answer" in content or "अंतिम उत्तर" in content
+    if task == "generate":
+        has_questions = "Questions:" in content or "प्रश्न:" in content
+        has_answers = "Answers:" in content or "उत्तर:" in content
+        return has_questions and has_answers
+    return True
+
+
+def record(route: str, model: str, latency: float, ok: bool, quality_ok: Optional[bool] = None):
+    """Records the outcome of one attempt for a route and model."""
+    with _lock:
+        stats = _route_stats.setdefault(route, {}).setdefault(model, {
+            "calls": 0,
+            "errors": 0,
+            "latency_total": 0.0,
+            "latency_ewma": None,
+            "quality_passed": 0,
+            "quality_failed": 0,
+        })
+        stats["calls"] += 1
+        if ok:
+            stats["latency_total"] += latency
+            stats["latency_ewma"] = _ewma(stats["latency_ewma"], latency)
+        else:
+            stats["errors"] += 1
+        if quality_ok is True:
+            stats["quality_passed"] += 1
+        elif quality_ok is False:
+            stats["quality_failed"] += 1
+
+        model_stats = _model_stats.setdefault(model, {"error_ewma": 0.0, "last_attempt": 0.0})
+        model_stats["last_attempt"] = time.monotonic()
+        if ok and model_stats["error_ewma"] > MAX_ERROR_RATE:
+            # A successful probe ends the outage rather than waiting for the average to decay
+            model_stats["error_ewma"] = 0.0
+        else:
+            model_stats["error_ewma"] = _ewma(model_stats["error_ewma"], 0.0 if ok else 1.0)
+
+
+def route_stats() -> Dict[str, Dict[str, dict]]:
+    """Returns a snapshot of per-route, per-model statistics."""
+    with _lock:
+        snapshot = {}
+        for route, models in _route_stats.items():
+            snapshot[route] = {}
+            for model, stats in models.items():
+                successes = stats["calls"] - stats["errors"]
+                snapshot[route][model] = dict(
+                    stats,
+                    latency_mean=stats["latency_total"] / successes if successes else None
+                )
+        return snapshot
+
+
+def complete_with_fallback(call: Callable[[str, List[Dict], float], str], messages: List[Dict], task: str,
+                           question_type: Optional[str] = None, difficulty: Optional[str] = None) -> str:
+    """
+    Runs a completion on the routed models, falling back on timeout or error.
+
+    Args:
+        call: Function taking (model, messages, timeout) and returning the answer text
+        messages: Chat messages for the completion API
+        task: "solve" or "generate"
+        question_type: Key of QUESTION_TYPE_MAP, for generate requests
+        difficulty: Difficulty label in either language, for generate requests
+
+    Returns:
+        Answer text from the first model that succeeds
+
+    Raises:
+        The last model's exception if every model fails
+    """
+    route = route_key(task, question_type, difficulty)
+    models = choose_models(task, question_type, difficulty, estimate_tokens(messages))
+
+    last_error = None
+    for model in models:
+        start = time.perf_counter()
+        try:
+            content = call(model, messages, MODEL_TIMEOUTS.get(model, 120))
+            if not content:
+                raise ValueError(f"{model} returned an empty response")
+        except Exception as e:
+            latency = time.perf_counter() - start
+            record(route, model, latency, ok=False)
+            logger.warning(f"{route}: {model} failed after {latency:.1f}s, trying next model: {e}")
+            last_error = e
+            continue
+
+        latency = time.perf_counter() - start
+        quality_ok = check_quality(task, content)
+        record(route, model, latency, ok=True, quality_ok=quality_ok)
+        logger.info(f"{route}: {model} answered in {latency:.1f}s (quality check {'passed' if quality_ok else 'failed'})")
+        return content
+
+    raise last_error
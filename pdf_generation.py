@@ -1,8 +1,15 @@
-import streamlit as st
+import hashlib
+import logging
 import os
+import re
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
 from pathlib import Path
-from markdown_pdf import MarkdownPdf, Section
+from typing import BinaryIO, List, Tuple
 
+logger = logging.getLogger(__name__)
 
 
 # Get base directory and temp settings
@@ -10,11 +17,18 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 TEMP_ROOT = os.environ.get('TEMP_ROOT', BASE_DIR / 'temp')
 TEMP_URL = os.environ.get('TEMP_URL', '/temp/')
 
-# Ensure temp directory exists
-os.makedirs(TEMP_ROOT, exist_ok=True)
+# Upper bound on the rendered section PDFs kept in memory
+SECTION_CACHE_BYTES = int(os.environ.get('PDF_SECTION_CACHE_BYTES', 64 * 1024 * 1024))
 
+_section_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_section_cache_size = 0
+_section_cache_lock = threading.Lock()
 
-def create_pdf(text: str, filename: str) -> bytes:
+# Runs of characters not allowed in bundle file names
+UNSAFE_NAME_CHARS = re.compile(r'[^\w\u0900-\u097F .-]+')
+
+
+def create_pdf(text: str, filename: str, root: str = ".") -> bytes:
     """
     Creates a PDF from markdown text and returns the PDF content.
     Uses the configured TEMP_ROOT directory.
@@ -22,17 +36,26 @@ def create_pdf(text: str, filename: str) -> bytes:
     Args:
         text: Markdown text to convert
         filename: Output filename
+        root: Directory that image paths in the markdown are relative to
         
     Returns:
         bytes: The PDF content
     """
+    from markdown_pdf import MarkdownPdf, Section
+
     try:
+        # Ensure temp directory exists
+        os.makedirs(TEMP_ROOT, exist_ok=True)
+
         # Create the full path for the PDF in the temp directory
         temp_pdf_path = os.path.join(TEMP_ROOT, filename)
         
         # Create the PDF
         pdf = MarkdownPdf(toc_level=2)
-        pdf.add_section(Section(text))
+        pdf.add_section(Section(text, root=root))
+        # A section may start below the top heading level (e.g. one question of a
+        # split answer opening with "##"), which PyMuPDF rejects as an outline
+        pdf.toc = _normalise_toc(pdf.toc)
         pdf.save(temp_pdf_path)
         
         # Read the PDF content
@@ -43,8 +66,150 @@ def create_pdf(text: str, filename: str) -> bytes:
         try:
             os.remove(temp_pdf_path)
         except Exception as cleanup_error:
-            st.warning(f"Warning: Could not clean up temporary file: {cleanup_error}")
+            logger.warning(f"Could not clean up temporary file: {cleanup_error}")
         
         return pdf_content
     except Exception as e:
         raise Exception(f"Error creating PDF: {str(e)}")
+
+
+def section_key(text: str, root: str = ".") -> str:
+    """Returns the content hash used to cache a rendered section."""
+    return hashlib.sha256(f"{root}\0{text}".encode('utf-8')).hexdigest()
+
+
+def render_section(text: str, root: str = ".") -> bytes:
+    """
+    Renders one worksheet section to PDF, reusing the cached result when the
+    same content has been rendered before.
+
+    Args:
+        text: Markdown text of the section
+        root: Directory that image paths in the markdown are relative to
+
+    Returns:
+        bytes: The section PDF
+    """
+    global _section_cache_size
+
+    key = section_key(text, root)
+    with _section_cache_lock:
+        if key in _section_cache:
+            _section_cache.move_to_end(key)
+            return _section_cache[key]
+
+    pdf_content = create_pdf(text, f"section_{key[:16]}_{uuid.uuid4().hex}.pdf", root=root)
+
+    with _section_cache_lock:
+        if key not in _section_cache:
+            _section_cache[key] = pdf_content
+            _section_cache_size += len(pdf_content)
+            # Evict least recently used sections
+            while _section_cache_size > SECTION_CACHE_BYTES and len(_section_cache) > 1:
+                _, evicted = _section_cache.popitem(last=False)
+                _section_cache_size -= len(evicted)
+    return pdf_content
+
+
+def _append_sections(document, fragments: List[bytes], toc: list, title: str = None):
+    """Inserts rendered section PDFs into an open PyMuPDF document and extends its outline."""
+    import pymupdf
+
+    if title:
+        toc.append([1, title, document.page_count + 1])
+    for fragment_content in fragments:
+        with pymupdf.open(stream=fragment_content, filetype="pdf") as fragment:
+            page_offset = document.page_count
+            for level, entry_title, page in fragment.get_toc():
+                toc.append([level + (1 if title else 0), entry_title, page + page_offset])
+            document.insert_pdf(fragment)
+
+
+def _normalise_toc(toc: list) -> list:
+    """Clamps outline levels so each entry is at most one level below the previous one."""
+    normalised = []
+    previous_level = 0
+    for level, *entry in toc:
+        level = max(1, min(level, previous_level + 1))
+        normalised.append([level, *entry])
+        previous_level = level
+    return normalised
+
+
+def create_worksheet_pdf(sections: List[str], root: str = ".") -> bytes:
+    """
+    Assembles a worksheet PDF from its ordered sections.
+
+    Each section is rendered once and cached by content hash, so changing or
+    regenerating one question only renders that question again.
+
+    Args:
+        sections: Markdown text of each section, in order
+        root: Directory that image paths in the markdown are relative to
+
+    Returns:
+        bytes: The PDF content
+    """
+    import pymupdf
+
+    # create_pdf already reports rendering errors, so only assembly errors are wrapped here
+    fragments = [render_section(text, root) for text in sections]
+    try:
+        with pymupdf.open() as document:
+            toc = []
+            _append_sections(document, fragments, toc)
+            document.set_toc(_normalise_toc(toc))
+            return document.tobytes(garbage=3, deflate=True)
+    except Exception as e:
+        raise Exception(f"Error creating PDF: {str(e)}")
+
+
+def bundle_name(name: str) -> str:
+    """Reduces a client-supplied worksheet name to a plain file name without directories."""
+    name = os.path.basename((name or "").replace("\\", "/"))
+    return UNSAFE_NAME_CHARS.sub("_", name).strip(" .")[:100]
+
+
+def write_worksheet_bundle(worksheets: List[Tuple[str, List[str]]], stream: BinaryIO, fmt: str = "zip",
+                           root: str = "."):
+    """
+    Writes several worksheets to a stream, either as one combined PDF or as a
+    ZIP archive with one PDF per worksheet.
+
+    Args:
+        worksheets: (name, sections) pairs, in order
+        stream: Writable binary stream; it does not need to be seekable
+        fmt: "pdf" or "zip"
+        root: Directory that image paths in the markdown are relative to
+    """
+    import pymupdf
+
+    if fmt == "zip":
+        archive = zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED)
+        try:
+            used_names = set()
+            for i, (name, sections) in enumerate(worksheets, 1):
+                stem = bundle_name(name) or f"worksheet_{i}"
+                file_name = f"{stem}.pdf"
+                copy = 1
+                while file_name in used_names:
+                    copy += 1
+                    file_name = f"{stem}_{copy}.pdf"
+                used_names.add(file_name)
+                # PDF streams are already deflated, so the archive stores them as-is
+                archive.writestr(file_name, create_worksheet_pdf(sections, root))
+        except BaseException:
+            # Detach the stream without writing the central directory, so a
+            # failed bundle never ends up as a valid but incomplete ZIP
+            archive.fp = None
+            raise
+        archive.close()
+    elif fmt == "pdf":
+        with pymupdf.open() as document:
+            toc = []
+            for name, sections in worksheets:
+                _append_sections(document, [render_section(text, root) for text in sections], toc, title=name)
+            document.set_toc(_normalise_toc(toc))
+            stream.write(document.tobytes(garbage=3, deflate=True))
+    else:
+        raise ValueError(f"Unknown bundle format: {fmt}")
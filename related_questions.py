@@ -0,0 +1,89 @@
+"""
+Related textbook questions from a precomputed neighbour table.
+
+build_similarity.py vectorises every question and sub-question of both
+textbooks offline and stores the top-k neighbours of each one. Lookups here
+are a dictionary access plus a few array reads, with no API call.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SIMILARITY_DIR = os.environ.get("SIMILARITY_DIR", os.path.join(BASE_DIR, "similarity"))
+NEIGHBOURS_PATH = os.path.join(SIMILARITY_DIR, "neighbours.npz")
+ITEMS_PATH = os.path.join(SIMILARITY_DIR, "items.json")
+
+
+@lru_cache(maxsize=1)
+def load_index() -> Optional[dict]:
+    """
+    Loads the neighbour table and item list, or returns None if they have not been built.
+
+    Returns:
+        Dict with "items" (list of item dicts), "positions" (text -> row),
+        "neighbours" (rows x k indices) and "scores" (rows x k similarities)
+    """
+    if not (os.path.exists(NEIGHBOURS_PATH) and os.path.exists(ITEMS_PATH)):
+        return None
+
+    import numpy as np
+
+    with np.load(NEIGHBOURS_PATH) as table:
+        neighbours = table["neighbours"]
+        scores = table["scores"]
+    with open(ITEMS_PATH, 'r') as file:
+        items = json.load(file)
+
+    positions = {}
+    for row, item in enumerate(items):
+        positions.setdefault(item["text"], row)
+    return {"items": items, "positions": positions, "neighbours": neighbours, "scores": scores}
+
+
+def related(questions: Iterable[str], limit: int = 5, min_score: float = 0.1,
+            exclude: Iterable[str] = ()) -> List[Dict]:
+    """
+    Returns textbook questions similar to the given ones.
+
+    Args:
+        questions: Question texts to find neighbours for
+        limit: Maximum number of suggestions
+        min_score: Minimum cosine similarity of a suggestion
+        exclude: Question texts not to suggest
+
+    Returns:
+        Item dicts (text, language, chapter, exercise, group, figure) with a "score",
+        most similar first
+    """
+    index = load_index()
+    if index is None:
+        return []
+
+    questions = list(questions)
+    skip = set(questions) | set(exclude)
+    best: Dict[int, float] = {}
+    for question in questions:
+        row = index["positions"].get(question)
+        if row is None:
+            continue
+        for neighbour, score in zip(index["neighbours"][row], index["scores"][row]):
+            score = float(score)
+            if score < min_score or index["items"][neighbour]["text"] in skip:
+                continue
+            if score > best.get(int(neighbour), 0.0):
+                best[int(neighbour)] = score
+
+    # Suggest at most one sub-question of each textbook question
+    suggestions = []
+    groups = set()
+    for row, score in sorted(best.items(), key=lambda item: item[1], reverse=True):
+        item = index["items"][row]
+        if item["group"] in groups:
+            continue
+        groups.add(item["group"])
+        suggestions.append(dict(item, score=score))
+        if len(suggestions) == limit:
+            break
+    return suggestions
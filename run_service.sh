@@ -0,0 +1 @@
+python service_api.py --host 0.0.0.0 --port $SERVICE_PORT --workers ${SERVICE_WORKERS:-8}
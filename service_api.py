@@ -0,0 +1,258 @@
+"""
+HTTP/JSON API around tutor_service.
+
+Each worker process is stateless: every request carries everything needed to
+serve it, so any number of workers can run behind a load balancer. Blocking
+work (completions, LaTeX processing, PDF rendering) runs on a bounded thread
+pool so the event loop keeps accepting requests.
+
+Run with:
+    python service_api.py --host 0.0.0.0 --port 8000 --workers 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from aiohttp import web
+
+import model_router
+import tutor_service
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KEY = web.AppKey("executor", ThreadPoolExecutor)
+
+BUNDLE_CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "zip": "application/zip"
+}
+
+
+async def run_blocking(request: web.Request, func, *args, **kwargs):
+    """Runs a blocking service call on the worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[EXECUTOR_KEY], partial(func, *args, **kwargs))
+
+
+async def read_json(request: web.Request, *required: str) -> dict:
+    """Reads a JSON object body and checks that the required fields are present."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(payload, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    missing = [field for field in required if field not in payload]
+    if missing:
+        raise web.HTTPBadRequest(text=f"Missing fields: {', '.join(missing)}")
+    return payload
+
+
+def check_choice(payload: dict, field: str, choices) -> str:
+    """Returns a field's value, rejecting it unless it is one of the given choices."""
+    value = payload[field]
+    if not isinstance(value, str) or value not in choices:
+        raise web.HTTPBadRequest(text=f"Invalid {field}: {value!r}. Expected one of: {', '.join(choices)}")
+    return value
+
+
+def check_type(value, expected: type, field: str):
+    """Rejects a field value that is not of the expected JSON type."""
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise web.HTTPBadRequest(text=f"Invalid {field}: expected {expected.__name__}")
+    return value
+
+
+def check_strings(value, field: str, optional: bool = False) -> list:
+    """Rejects a field value that is not a list of strings (or of nulls, when optional)."""
+    check_type(value, list, field)
+    for item in value:
+        if not (isinstance(item, str) or (optional and item is None)):
+            raise web.HTTPBadRequest(text=f"Invalid {field}: expected a list of strings")
+    return value
+
+
+def check_figures(payload: dict) -> Optional[list]:
+    """Validates optional per-section figure lists."""
+    figures = payload.get("figures")
+    if figures is None:
+        return None
+    check_type(figures, list, "figures")
+    for section_figures in figures:
+        if section_figures is not None:
+            check_strings(section_figures, "figures")
+    return figures
+
+
+def check_worksheets(payload: dict) -> list:
+    """Validates every worksheet of a bundle request."""
+    worksheets = check_type(payload["worksheets"], list, "worksheets")
+    if not worksheets:
+        raise web.HTTPBadRequest(text="Invalid worksheets: expected at least one worksheet")
+    for worksheet in worksheets:
+        check_type(worksheet, dict, "worksheets")
+        if "sections" not in worksheet:
+            raise web.HTTPBadRequest(text="Missing fields: worksheets[].sections")
+        check_strings(worksheet["sections"], "sections")
+        check_figures(worksheet)
+        if worksheet.get("name") is not None:
+            check_type(worksheet["name"], str, "name")
+    return worksheets
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response({"routes": model_router.route_stats()})
+
+
+async def chapter(request: web.Request) -> web.Response:
+    language = request.match_info["language"]
+    try:
+        chapter_number = int(request.match_info["chapter"])
+    except ValueError:
+        raise web.HTTPBadRequest(text="Chapter must be a number")
+    data = await run_blocking(request, tutor_service.load_chapter, language, chapter_number)
+    if data is None:
+        raise web.HTTPNotFound(text=f"No data found for Chapter {chapter_number} in {language} language.")
+    return web.json_response(data)
+
+
+async def solve(request: web.Request) -> web.Response:
+    payload = await read_json(request, "questions", "language")
+    language = check_choice(payload, "language", tutor_service.CHAPTER_PATHS)
+    questions = check_strings(payload["questions"], "questions")
+    figures = payload.get("figures")
+    if figures is not None:
+        check_type(figures, dict, "figures")
+        check_strings(list(figures.values()), "figures")
+    content = await run_blocking(request, tutor_service.solve_questions, questions, language, figures)
+    return web.json_response({"content": content})
+
+
+async def generate(request: web.Request) -> web.Response:
+    payload = await read_json(request, "question", "count", "language", "difficulty", "question_type")
+    if payload.get("figure") is not None:
+        check_type(payload["figure"], str, "figure")
+    if check_type(payload["count"], int, "count") < 1:
+        raise web.HTTPBadRequest(text="Invalid count: must be at least 1")
+    content = await run_blocking(
+        request,
+        tutor_service.generate_variations,
+        check_type(payload["question"], str, "question"),
+        payload["count"],
+        check_choice(payload, "language", tutor_service.CHAPTER_PATHS),
+        check_choice(payload, "difficulty", tutor_service.DIFFICULTY_MAP),
+        check_choice(payload, "question_type", tutor_service.QUESTION_TYPE_MAP),
+        payload.get("figure")
+    )
+    return web.json_response({"content": content})
+
+
+async def prepare(request: web.Request) -> web.Response:
+    payload = await read_json(request, "content")
+    result = await run_blocking(request, tutor_service.prepare_content, check_type(payload["content"], str, "content"))
+    return web.json_response(result)
+
+
+async def pdf(request: web.Request) -> web.Response:
+    payload = await read_json(request, "text")
+    pdf_content = await run_blocking(request, tutor_service.render_pdf, check_type(payload["text"], str, "text"))
+    return web.Response(body=pdf_content, content_type="application/pdf")
+
+
+async def worksheet(request: web.Request) -> web.Response:
+    payload = await read_json(request, "sections")
+    pdf_content = await run_blocking(
+        request, tutor_service.render_worksheet, check_strings(payload["sections"], "sections"), check_figures(payload)
+    )
+    return web.Response(body=pdf_content, content_type="application/pdf")
+
+
+class ResponseWriter:
+    """
+    Minimal writable stream that forwards bytes from a worker thread to a
+    streaming HTTP response on the event loop.
+
+    The response is only prepared on the first write, so a failure before
+    any output (such as rendering the first PDF) still gets a proper error
+    status.
+    """
+
+    def __init__(self, request: web.Request, response: web.StreamResponse, loop: asyncio.AbstractEventLoop):
+        self.request = request
+        self.response = response
+        self.loop = loop
+
+    async def _write(self, data: bytes):
+        if not self.response.prepared:
+            await self.response.prepare(self.request)
+        await self.response.write(data)
+
+    def write(self, data: bytes) -> int:
+        asyncio.run_coroutine_threadsafe(self._write(bytes(data)), self.loop).result()
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+async def worksheet_bundle(request: web.Request) -> web.StreamResponse:
+    payload = await read_json(request, "worksheets")
+    fmt = check_choice(payload, "format", BUNDLE_CONTENT_TYPES) if "format" in payload else "zip"
+    worksheets = check_worksheets(payload)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": BUNDLE_CONTENT_TYPES[fmt],
+        "Content-Disposition": f'attachment; filename="worksheets.{fmt}"'
+    })
+    writer = ResponseWriter(request, response, asyncio.get_running_loop())
+    try:
+        await run_blocking(request, tutor_service.render_worksheet_bundle, worksheets, writer, fmt)
+    except Exception:
+        if not response.prepared:
+            raise
+        # Part of the body is already sent; drop the connection so the client
+        # sees a failed transfer rather than a complete but truncated file
+        logger.exception("Worksheet bundle failed after streaming started")
+        if request.transport is not None:
+            request.transport.abort()
+        raise
+    await response.write_eof()
+    return response
+
+
+def create_app(workers: int) -> web.Application:
+    """Builds the aiohttp application with a worker pool of the given size."""
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app[EXECUTOR_KEY] = ThreadPoolExecutor(max_workers=workers)
+
+    async def shutdown_executor(app: web.Application):
+        app[EXECUTOR_KEY].shutdown(wait=False)
+
+    app.on_cleanup.append(shutdown_executor)
+    app.router.add_get("/health", health)
+    app.router.add_get("/stats/routes", stats)
+    app.router.add_get("/chapters/{language}/{chapter}", chapter)
+    app.router.add_post("/solve", solve)
+    app.router.add_post("/generate", generate)
+    app.router.add_post("/prepare", prepare)
+    app.router.add_post("/pdf", pdf)
+    app.router.add_post("/worksheet", worksheet)
+    app.router.add_post("/worksheet/bundle", worksheet_bundle)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the MathsTutor service API")
+    parser.add_argument("--host", default=os.environ.get("SERVICE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVICE_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVICE_WORKERS", 8)))
+    args = parser.parse_args()
+    web.run_app(create_app(args.workers), host=args.host, port=args.port)
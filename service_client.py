@@ -0,0 +1,108 @@
+"""
+Client used by the Streamlit pages to reach the tutor service.
+
+When TUTOR_SERVICE_URL is set, calls go over HTTP to the service workers
+(see service_api.py). Otherwise they run in-process, which keeps a single
+`streamlit run Homepage.py` working without a separate service.
+"""
+import json
+import os
+import shutil
+import urllib.error
+import urllib.request
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional
+
+import tutor_service
+
+SERVICE_URL = os.environ.get("TUTOR_SERVICE_URL", "").rstrip("/")
+SERVICE_TIMEOUT = float(os.environ.get("TUTOR_SERVICE_TIMEOUT", 300))
+
+
+class ServiceError(Exception):
+    """Raised when the tutor service returns an error response."""
+
+
+def _request(path: str, payload: Optional[dict] = None, stream: Optional[BinaryIO] = None) -> bytes:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(
+        SERVICE_URL + path,
+        data=data,
+        headers={"Content-Type": "application/json"} if data is not None else {}
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=SERVICE_TIMEOUT) as response:
+            if stream is not None:
+                shutil.copyfileobj(response, stream)
+                return b""
+            return response.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            raise FileNotFoundError(e.read().decode("utf-8", "replace"))
+        raise ServiceError(f"{e.code}: {e.read().decode('utf-8', 'replace')}")
+
+
+def _request_json(path: str, payload: Optional[dict] = None) -> dict:
+    return json.loads(_request(path, payload))
+
+
+@lru_cache(maxsize=64)
+def load_chapter(language: str, chapter: int) -> Optional[dict]:
+    """
+    Returns a chapter's exercises. The parsed chapter is cached and shared by
+    every session in the process, so callers must not modify it.
+    """
+    if not SERVICE_URL:
+        return tutor_service.load_chapter(language, chapter)
+    try:
+        return _request_json(f"/chapters/{language}/{chapter}")
+    except FileNotFoundError:
+        return None
+
+
+def solve_questions(questions: List[str], language: str,
+                    figures: Optional[Dict[str, str]] = None) -> str:
+    if not SERVICE_URL:
+        return tutor_service.solve_questions(questions, language, figures)
+    return _request_json("/solve", {"questions": questions, "language": language, "figures": figures})["content"]
+
+
+def generate_variations(question: str, count: int, language: str,
+                        selected_difficulty: str, question_type: str,
+                        figure: Optional[str] = None) -> str:
+    if not SERVICE_URL:
+        return tutor_service.generate_variations(
+            question, count, language, selected_difficulty, question_type, figure
+        )
+    return _request_json("/generate", {
+        "question": question,
+        "count": count,
+        "language": language,
+        "difficulty": selected_difficulty,
+        "question_type": question_type,
+        "figure": figure
+    })["content"]
+
+
+def prepare_content(raw_content: str) -> Dict[str, str]:
+    if not SERVICE_URL:
+        return tutor_service.prepare_content(raw_content)
+    return _request_json("/prepare", {"content": raw_content})
+
+
+def render_pdf(text: str) -> bytes:
+    if not SERVICE_URL:
+        return tutor_service.render_pdf(text)
+    return _request("/pdf", {"text": text})
+
+
+def render_worksheet(sections: List[str], figures: Optional[List[Optional[List[str]]]] = None) -> bytes:
+    if not SERVICE_URL:
+        return tutor_service.render_worksheet(sections, figures)
+    return _request("/worksheet", {"sections": sections, "figures": figures})
+
+
+def render_worksheet_bundle(worksheets: List[Dict], stream: BinaryIO, fmt: str = "zip"):
+    if not SERVICE_URL:
+        return tutor_service.render_worksheet_bundle(worksheets, stream, fmt)
+    _request("/worksheet/bundle", {"worksheets": worksheets, "format": fmt}, stream=stream)
@@ -0,0 +1,80 @@
+"""
+Keeps large per-session values out of st.session_state.
+
+Values are stored in session_store and only their handles are kept in
+st.session_state.handles, so an idle session pins a few short strings
+rather than generated text and PDF bytes.
+"""
+import json
+import uuid
+
+import streamlit as st
+
+import session_store
+
+
+def session_id() -> str:
+    """Returns an id for the current browser session."""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+
+def _handles() -> dict:
+    if 'handles' not in st.session_state:
+        st.session_state.handles = {}
+    return st.session_state.handles
+
+
+def _expired() -> set:
+    if 'expired' not in st.session_state:
+        st.session_state.expired = set()
+    return st.session_state.expired
+
+
+def store(name: str, value, recomputable: bool = False):
+    """
+    Stores text or bytes under a name, replacing any previous value.
+
+    Values that are cheap to rebuild (such as rendered PDFs) should be marked
+    recomputable so the store evicts them before model output.
+    """
+    forget(name)
+    handle = session_store.put(session_id(), value, recomputable)
+    if handle:
+        _handles()[name] = handle
+    else:
+        # Too large to keep: report it as expired so pages don't silently recompute it
+        _expired().add(name)
+
+
+def load(name: str):
+    """Returns the value stored under a name, or None if it is missing or was evicted."""
+    handle = _handles().get(name)
+    value = session_store.get(handle)
+    if value is None and handle:
+        _handles().pop(name)
+        _expired().add(name)
+    return value
+
+
+def expired(name: str) -> bool:
+    """Returns whether the value stored under a name was evicted, as opposed to never stored or forgotten."""
+    return name in _expired()
+
+
+def forget(name: str):
+    """Removes the value stored under a name."""
+    _expired().discard(name)
+    session_store.discard(_handles().pop(name, None))
+
+
+def store_json(name: str, value):
+    """Stores a JSON-serialisable value under a name."""
+    store(name, json.dumps(value, ensure_ascii=False))
+
+
+def load_json(name: str):
+    """Returns a value stored with store_json, or None if it is missing or was evicted."""
+    value = load(name)
+    return json.loads(value) if value is not None else None
@@ -0,0 +1,180 @@
+"""
+Process-wide store for large per-session payloads.
+
+Streamlit sessions keep only opaque handles in st.session_state; the payloads
+(generated text, PDF bytes) live here, zlib-compressed where that helps.
+The store is bounded twice: each session has a byte quota, and the whole
+store has a global limit. Both evict payloads marked recomputable (such as
+rendered PDFs) before any others, least recently used first. Entries of
+sessions idle for longer than SESSION_IDLE_SECONDS are dropped, and
+per-session usage is logged every REPORT_INTERVAL seconds.
+
+Evicted payloads are simply gone: get() returns None. Callers recompute
+recomputable payloads; for the rest (model output) they should tell the
+user rather than silently producing a different result.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MAX_STORE_BYTES = int(os.environ.get("SESSION_STORE_MAX_BYTES", 256 * 1024 * 1024))
+SESSION_QUOTA_BYTES = int(os.environ.get("SESSION_QUOTA_BYTES", 8 * 1024 * 1024))
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", 2 * 60 * 60))
+REPORT_INTERVAL = float(os.environ.get("SESSION_REPORT_INTERVAL", 300))
+
+# Payloads that compress worse than this ratio (e.g. PDFs) are kept as-is
+MIN_COMPRESSION_RATIO = 0.9
+
+_lock = threading.Lock()
+# handle -> (session_id, stored bytes, compressed, is_text, recomputable)
+_entries: "OrderedDict[str, tuple]" = OrderedDict()
+_session_bytes: Dict[str, int] = {}
+_session_seen: Dict[str, float] = {}
+_total_bytes = 0
+_reporter_started = False
+
+
+def _drop(handle: str):
+    """Removes an entry. Caller holds the lock."""
+    global _total_bytes
+    session_id, data, _, _, _ = _entries.pop(handle)
+    _total_bytes -= len(data)
+    _session_bytes[session_id] -= len(data)
+    if not _session_bytes[session_id]:
+        del _session_bytes[session_id]
+
+
+def _eviction_order(handles):
+    """Orders handles recomputable first, then least recently used first."""
+    return sorted(handles, key=lambda handle: not _entries[handle][4])
+
+
+def _evict(session_id: str, incoming: int):
+    """Makes room for an incoming payload. Caller holds the lock."""
+    # Entries of the same session go first when it would exceed its quota
+    if _session_bytes.get(session_id, 0) + incoming > SESSION_QUOTA_BYTES:
+        for handle in _eviction_order(h for h, entry in _entries.items() if entry[0] == session_id):
+            if _session_bytes.get(session_id, 0) + incoming <= SESSION_QUOTA_BYTES:
+                break
+            _drop(handle)
+    if _total_bytes + incoming > MAX_STORE_BYTES:
+        for handle in _eviction_order(list(_entries)):
+            if _total_bytes + incoming <= MAX_STORE_BYTES:
+                break
+            _drop(handle)
+
+
+def put(session_id: str, value: Union[str, bytes], recomputable: bool = False) -> Optional[str]:
+    """
+    Stores a payload for a session.
+
+    Args:
+        session_id: Owning session
+        value: Text or bytes to store
+        recomputable: Whether the payload is cheap to rebuild, so it is evicted first
+
+    Returns:
+        Handle for the payload, or None if it is larger than the session quota
+    """
+    global _total_bytes
+
+    is_text = isinstance(value, str)
+    raw = value.encode("utf-8") if is_text else bytes(value)
+    data = zlib.compress(raw, 6)
+    compressed = len(data) < len(raw) * MIN_COMPRESSION_RATIO
+    if not compressed:
+        data = raw
+    if len(data) > SESSION_QUOTA_BYTES:
+        logger.warning(f"Session {session_id[:8]}: payload of {len(data)} bytes exceeds quota, not stored")
+        return None
+
+    handle = uuid.uuid4().hex
+    with _lock:
+        _evict(session_id, len(data))
+        _entries[handle] = (session_id, data, compressed, is_text, recomputable)
+        _total_bytes += len(data)
+        _session_bytes[session_id] = _session_bytes.get(session_id, 0) + len(data)
+        _session_seen[session_id] = time.monotonic()
+    _start_reporter()
+    return handle
+
+
+def get(handle: Optional[str]) -> Optional[Union[str, bytes]]:
+    """Returns the payload for a handle, or None if it was evicted or never stored."""
+    if not handle:
+        return None
+    with _lock:
+        entry = _entries.get(handle)
+        if entry is None:
+            return None
+        _entries.move_to_end(handle)
+        session_id, data, compressed, is_text, _ = entry
+        _session_seen[session_id] = time.monotonic()
+
+    raw = zlib.decompress(data) if compressed else data
+    return raw.decode("utf-8") if is_text else raw
+
+
+def discard(handle: Optional[str]):
+    """Removes a payload if it is still stored."""
+    with _lock:
+        if handle in _entries:
+            _drop(handle)
+
+
+def drop_idle_sessions(max_idle: float = SESSION_IDLE_SECONDS) -> int:
+    """Removes all payloads of sessions idle for longer than max_idle seconds and returns how many sessions."""
+    now = time.monotonic()
+    with _lock:
+        idle = {session_id for session_id, seen in _session_seen.items() if now - seen > max_idle}
+        for handle in [h for h, entry in _entries.items() if entry[0] in idle]:
+            _drop(handle)
+        for session_id in idle:
+            del _session_seen[session_id]
+    return len(idle)
+
+
+def usage() -> Dict[str, int]:
+    """Returns stored bytes per session."""
+    with _lock:
+        return dict(_session_bytes)
+
+
+def report():
+    """Drops idle sessions and logs per-session memory use."""
+    dropped = drop_idle_sessions()
+    per_session = usage()
+    total = sum(per_session.values())
+    logger.info(
+        f"Session store: {total / 1024:.0f} KiB in {len(per_session)} sessions "
+        f"(limit {MAX_STORE_BYTES / 1024:.0f} KiB, {dropped} idle sessions dropped)"
+    )
+    for session_id, size in sorted(per_session.items(), key=lambda item: item[1], reverse=True)[:10]:
+        logger.info(f"  session {session_id[:8]}: {size / 1024:.0f} KiB")
+
+
+def _report_loop():
+    while True:
+        time.sleep(REPORT_INTERVAL)
+        try:
+            report()
+        except Exception as e:
+            logger.warning(f"Session store report failed: {e}")
+
+
+def _start_reporter():
+    global _reporter_started
+    if _reporter_started or REPORT_INTERVAL <= 0:
+        return
+    with _lock:
+        if _reporter_started:
+            return
+        _reporter_started = True
+    threading.Thread(target=_report_loop, name="session-store-report", daemon=True).start()
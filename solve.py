@@ -1,18 +1,9 @@
 import streamlit as st
-from openai import OpenAI
-import os
 import streamlit.components.v1 as components
-from dotenv import load_dotenv
-from latexConvertor import convert_latex_document, process_latex_content
-import time
-from pdf_generation import create_pdf
-
-
-# api_key = st.secrets["openai"]["api_key"]
-
-from dotenv import load_dotenv
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
+import service_client
+import image_assets
+import session_manager
+from tutor_service import split_solution_sections
 
 def init_mathjax():
     """Initialize MathJax for rendering LaTeX equations"""
@@ -34,11 +25,16 @@ def init_mathjax():
         height=0
     )
 
+def section_figures(questions, figures, num_sections):
+    """Places each question's figure with its solution section, or with the first section if they don't line up."""
+    if num_sections == len(questions):
+        return [[figures[question]] if question in figures else [] for question in questions]
+    return [[figures[question] for question in questions if question in figures]] + [[]] * (num_sections - 1)
+
 def solve():
     # Initialize MathJax first
     init_mathjax()
     
-    client = OpenAI(api_key=api_key)
     language = st.session_state.language
 
     
@@ -50,47 +46,48 @@ def solve():
     st.write("### Selected Questions")
     for i, question in enumerate(st.session_state.question_queue, 1):
         st.markdown(f"**Question {i}:** {question}")
+        if question in st.session_state.question_figures:
+            thumbnail = image_assets.thumbnail_path(st.session_state.question_figures[question])
+            if thumbnail:
+                st.image(thumbnail)
 
     st.write("### Solutions")
     
-    system_message = """You are an experienced mathematics teacher. Solve the questions given, following these guidelines:
-    1. Include step-by-step solutions
-    2. Use LaTeX formatting for mathematical expressions (use $ for inline math and $$ for display math)
-    3. Show complete solution with final answers written as Final Answer: <answer>
-    4. Ensure that the last step, with the final value of the variable, is displayed at the end of the solution. The value should be in numbers, do not write an unsolved equation as the final value
-    5. Whenever showing the solution, first explain the concept that is being tested by the question in simple terms 
-    6. While explaining a concept , besides giving an example, also give a counter-example at the beginning . That always makes things clear
-    7. Any time you write a solution,  explain the solution in a way that is extremely easy to understand by children struggling with complex technical terms 
-    8. Whenever trying to explain in simple terms : 1. use colloquial local language terms and try to avoid technical terms . When using technical terms , re explain those terms in local colloquial terms 
-    9. Recheck the solution for any mistakes
-    10. Start each question-solution pair with '**Question N:**' where N is the question number, and reproduce the question in bold letters before following it up with detailed solution"""
-    
-    prompt = f"Please solve the following mathematics questions in {st.session_state.language} step by step:\n\n"
-    for i, question in enumerate(st.session_state.question_queue, 1):
-        prompt += f"Question {i}: {question}\n"
-
-    
-    with st.spinner("Generating solutions... Please wait"):
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        
-        raw_answer = response.choices[0].message.content
+    questions = list(st.session_state.question_queue)
+    figures = {
+        question: st.session_state.question_figures[question]
+        for question in questions
+        if question in st.session_state.question_figures
+    }
+
+    # The answer is kept in the session store so reruns (e.g. the download click) don't solve again
+    raw_answer = session_manager.load("solve_answer")
+    if raw_answer is None and session_manager.expired("solve_answer"):
+        # Solving again would bill another completion and may give a different answer,
+        # so only do it when the teacher asks
+        expired_msg = "परिणाम समाप्त हो गए हैं। कृपया फिर से हल करें।" if language == "Hindi" else "These results have expired. Please solve again."
+        st.warning(expired_msg)
+        solve_again_label = "फिर से हल करें" if language == "Hindi" else "Solve Again"
+        if st.button(solve_again_label):
+            session_manager.forget("solve_answer")
+            st.rerun()
+        return
+    if raw_answer is None:
+        with st.spinner("Generating solutions... Please wait"):
+            raw_answer = service_client.solve_questions(questions, language, figures)
+        session_manager.store("solve_answer", raw_answer)
+        session_manager.forget("solve_pdf")
         
-        # Display content using Streamlit's markdown
-        st.markdown(raw_answer, unsafe_allow_html=True)
-
-    processed_content = process_latex_content(raw_answer)
+    # Display content using Streamlit's markdown
+    st.markdown(raw_answer, unsafe_allow_html=True)
 
-    
-    formatted_text = convert_latex_document(processed_content)
     try:
-        pdf_content = create_pdf(formatted_text, f"questions_and_answers_{int(time.time())}.pdf")
+        pdf_content = session_manager.load("solve_pdf")
+        if pdf_content is None:
+            # One section per question, so unchanged questions reuse their rendered pages
+            sections = split_solution_sections(raw_answer)
+            pdf_content = service_client.render_worksheet(sections, section_figures(questions, figures, len(sections)))
+            session_manager.store("solve_pdf", pdf_content, recomputable=True)
         download_label = "डाउनलोड PDF" if language == "Hindi" else "Download PDF"
         st.download_button(
             label=download_label,
@@ -107,6 +104,9 @@ def solve():
     if st.button("Clear Selected Questions"):
         st.session_state.question_queue.clear()
         st.session_state.checked_questions.clear()
+        st.session_state.question_figures.clear()
+        session_manager.forget("solve_answer")
+        session_manager.forget("solve_pdf")
         st.success("Selected questions cleared!")
         st.rerun()
 
@@ -0,0 +1,125 @@
+"""
+Startup profiling mode.
+
+Imports the modules Homepage.py loads at startup in a fresh interpreter with
+`-X importtime` and reports the per-module import cost. It doubles as a
+cold-start regression check: it exits non-zero when a module that should only
+load on first use of Solve, Generate or PDF export was imported, or when the
+total import time exceeds --budget-ms (COLD_START_BUDGET_MS by default).
+tests/test_cold_start.py runs the same check under pytest.
+
+    python startup_profile.py                 # report the 20 slowest modules
+    python startup_profile.py --budget-ms 800
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINT = os.path.join(BASE_DIR, "Homepage.py")
+
+# Modules that must not be imported until Solve, Generate or PDF export is used
+LAZY_MODULES = ["openai", "pylatexenc", "markdown_pdf", "fitz", "pymupdf", "dotenv"]
+
+# Cold-start import budget in milliseconds; about four times the current cost
+COLD_START_BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", 1500))
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def startup_imports(entry_point: str = ENTRY_POINT) -> List[str]:
+    """Returns the modules imported at the top level of the entry point."""
+    with open(entry_point, 'r') as file:
+        tree = ast.parse(file.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def profile_imports(modules: List[str]) -> Tuple[List[Tuple[str, int, int]], List[str]]:
+    """
+    Imports the modules in a fresh interpreter and collects import timings.
+
+    Args:
+        modules: Module names to import
+
+    Returns:
+        Tuple of ([(module, self_us, cumulative_us), ...], loaded module names)
+    """
+    script = (
+        "import sys\n"
+        f"import {', '.join(modules)}\n"
+        "print('\\n'.join(sorted(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n" + "\n".join(errors))
+
+    timings = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            timings.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return timings, result.stdout.split()
+
+
+def top_level_total(timings: List[Tuple[str, int, int]], modules: List[str]) -> int:
+    """Sums cumulative time of the requested modules, in microseconds."""
+    cumulative: Dict[str, int] = {}
+    for name, _, cumulative_us in timings:
+        cumulative[name] = cumulative_us
+    return sum(cumulative.get(module, 0) for module in modules)
+
+
+def eager_modules(loaded: List[str]) -> List[str]:
+    """Returns the loaded modules that should only be imported on first use."""
+    return sorted(name for name in loaded if name.split(".")[0] in LAZY_MODULES)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report per-module import cost at startup")
+    parser.add_argument("modules", nargs="*", help="Modules to profile (default: Homepage.py imports)")
+    parser.add_argument("--top", type=int, default=20, help="Number of modules to list")
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS,
+                        help="Fail if total import time exceeds this")
+    args = parser.parse_args()
+
+    modules = args.modules or startup_imports()
+    timings, loaded = profile_imports(modules)
+    total_ms = top_level_total(timings, modules) / 1000
+
+    print(f"Cold-start imports: {', '.join(modules)}")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+    print(f"Total: {total_ms:.1f} ms across {len(timings)} modules")
+
+    failures = []
+    eager = eager_modules(loaded)
+    if eager:
+        failures.append(f"Modules that should load lazily were imported at startup: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"Cold-start import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
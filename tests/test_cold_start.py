@@ -0,0 +1,37 @@
+"""
+Cold-start regression test for the Streamlit entry point.
+
+Imports what Homepage.py loads at startup in a fresh interpreter (see
+startup_profile.py) and checks that heavy modules stay lazy and that the
+total import time stays within COLD_START_BUDGET_MS.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import startup_profile  # noqa: E402
+
+pytest.importorskip("streamlit")
+
+
+@pytest.fixture(scope="module")
+def cold_start():
+    modules = startup_profile.startup_imports()
+    timings, loaded = startup_profile.profile_imports(modules)
+    return modules, timings, loaded
+
+
+def test_heavy_modules_load_lazily(cold_start):
+    _, _, loaded = cold_start
+    assert startup_profile.eager_modules(loaded) == []
+
+
+def test_cold_start_within_budget(cold_start):
+    modules, timings, _ = cold_start
+    total_ms = startup_profile.top_level_total(timings, modules) / 1000
+    assert total_ms <= startup_profile.COLD_START_BUDGET_MS, (
+        f"Cold-start import time {total_ms:.1f} ms exceeds budget of {startup_profile.COLD_START_BUDGET_MS:.1f} ms"
+    )
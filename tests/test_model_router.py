@@ -0,0 +1,121 @@
+"""
+Tests for model routing, fallback and recovery of failing models.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_router  # noqa: E402
+from model_router import LARGE_MODEL, SMALL_MODEL  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Solve 2 + 2"}]
+SIMPLE_ROUTE = ("generate", "True/False", "Same Level")
+
+
+class FakeModels:
+    """Completion call that fails for the models listed in `down` and records who was called."""
+
+    def __init__(self, down=(), content="Final Answer: 4"):
+        self.down = set(down)
+        self.content = content
+        self.calls = []
+
+    def __call__(self, model, messages, timeout):
+        self.calls.append(model)
+        if model in self.down:
+            raise TimeoutError(f"{model} timed out")
+        return self.content
+
+
+@pytest.fixture(autouse=True)
+def clean_stats(monkeypatch):
+    monkeypatch.setattr(model_router, "_route_stats", {})
+    monkeypatch.setattr(model_router, "_model_stats", {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_routes_simple_requests_to_small_model():
+    assert model_router.choose_models(*SIMPLE_ROUTE, prompt_tokens=100) == [SMALL_MODEL, LARGE_MODEL]
+    assert model_router.choose_models("solve") == [LARGE_MODEL, SMALL_MODEL]
+    assert model_router.choose_models("generate", "Short Answer Type", "Same Level") == [LARGE_MODEL, SMALL_MODEL]
+    long_prompt = model_router.SMALL_MODEL_MAX_PROMPT_TOKENS + 1
+    assert model_router.choose_models(*SIMPLE_ROUTE, prompt_tokens=long_prompt) == [LARGE_MODEL, SMALL_MODEL]
+
+
+def test_simple_route_prefers_model_faster_on_that_route():
+    route = model_router.route_key(*SIMPLE_ROUTE)
+    for _ in range(model_router.MIN_LATENCY_SAMPLES):
+        model_router.record(route, SMALL_MODEL, 2.0, ok=True)
+        model_router.record(route, LARGE_MODEL, 1.0, ok=True)
+        # Slow solves must not count against the large model on the simple route
+        model_router.record("solve", LARGE_MODEL, 60.0, ok=True)
+    assert model_router.choose_models(*SIMPLE_ROUTE) == [LARGE_MODEL, SMALL_MODEL]
+
+
+def test_small_model_outage_falls_back_to_large_model():
+    models = FakeModels(down={SMALL_MODEL}, content="Questions:\n1. x\nAnswers:\n1. y")
+    content = model_router.complete_with_fallback(models, MESSAGES, *SIMPLE_ROUTE)
+
+    assert content.startswith("Questions:")
+    assert models.calls == [SMALL_MODEL, LARGE_MODEL]
+    stats = model_router.route_stats()[model_router.route_key(*SIMPLE_ROUTE)]
+    assert stats[SMALL_MODEL]["errors"] == 1
+    assert stats[LARGE_MODEL]["calls"] == 1
+    assert stats[LARGE_MODEL]["quality_passed"] == 1
+
+
+def test_empty_answer_falls_back():
+    calls = []
+
+    def call(model, messages, timeout):
+        calls.append(model)
+        return "" if model == LARGE_MODEL else "Final Answer: 4"
+
+    assert model_router.complete_with_fallback(call, MESSAGES, "solve") == "Final Answer: 4"
+    assert calls == [LARGE_MODEL, SMALL_MODEL]
+
+
+def test_demoted_model_is_probed_again_and_recovers(clock):
+    outage = FakeModels(down={LARGE_MODEL})
+    while model_router._model_stats.get(LARGE_MODEL, {}).get("error_ewma", 0) <= model_router.MAX_ERROR_RATE:
+        model_router.complete_with_fallback(outage, MESSAGES, "solve")
+    assert model_router.choose_models("solve") == [SMALL_MODEL, LARGE_MODEL]
+
+    # Still demoted within the retry interval
+    clock[0] += model_router.MODEL_RETRY_SECONDS / 2
+    assert model_router.choose_models("solve") == [SMALL_MODEL, LARGE_MODEL]
+
+    # One request probes it once the interval has passed; concurrent ones keep avoiding it
+    clock[0] += model_router.MODEL_RETRY_SECONDS
+    healthy = FakeModels()
+    model_router.complete_with_fallback(healthy, MESSAGES, "solve")
+    assert healthy.calls == [LARGE_MODEL]
+    assert model_router.choose_models("solve") == [LARGE_MODEL, SMALL_MODEL]
+
+
+def test_failed_probe_keeps_model_demoted(clock):
+    outage = FakeModels(down={LARGE_MODEL})
+    for _ in range(4):
+        model_router.complete_with_fallback(outage, MESSAGES, "solve")
+
+    clock[0] += model_router.MODEL_RETRY_SECONDS
+    outage.calls.clear()
+    model_router.complete_with_fallback(outage, MESSAGES, "solve")
+    assert outage.calls == [LARGE_MODEL, SMALL_MODEL]
+    assert model_router.choose_models("solve") == [SMALL_MODEL, LARGE_MODEL]
+
+
+def test_raises_last_error_when_every_model_fails():
+    models = FakeModels(down={SMALL_MODEL, LARGE_MODEL})
+    with pytest.raises(TimeoutError, match=SMALL_MODEL):
+        model_router.complete_with_fallback(models, MESSAGES, "solve")
+    assert models.calls == [LARGE_MODEL, SMALL_MODEL]
@@ -0,0 +1,64 @@
+"""
+Tests for worksheet PDF assembly from per-question sections.
+"""
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("markdown_pdf")
+pymupdf = pytest.importorskip("pymupdf")
+
+import tutor_service  # noqa: E402
+from pdf_generation import bundle_name, write_worksheet_bundle  # noqa: E402
+
+SOLVE_ANSWER = """# Solutions
+
+**Question 1:** Find the HCF of 96 and 404.
+
+## Concept
+
+The HCF divides both numbers.
+
+**Final Answer:** 4
+
+**Question 2:** Is 7 × 11 × 13 + 13 composite?
+
+## Concept
+
+A number with a factor other than 1 and itself is composite.
+
+**Final Answer:** Yes
+"""
+
+
+def test_split_answer_renders_with_outline():
+    sections = tutor_service.split_solution_sections(SOLVE_ANSWER)
+    assert len(sections) == 2
+    assert sections[1].lstrip().startswith("**Question 2:**")
+
+    with pymupdf.open(stream=tutor_service.render_worksheet(sections), filetype="pdf") as document:
+        toc = document.get_toc()
+    assert [title for _, title, _ in toc] == ["Solutions", "Concept", "Concept"]
+    assert toc[0][0] == 1
+
+
+def test_section_starting_below_top_level_renders():
+    with pymupdf.open(stream=tutor_service.render_worksheet(["## Concept\n\nText", "# Part\n\n## Detail"]),
+                      filetype="pdf") as document:
+        assert [level for level, _, _ in document.get_toc()] == [1, 1, 2]
+
+
+def test_bundle_names_stay_inside_archive():
+    stream = io.BytesIO()
+    write_worksheet_bundle(
+        [("../../etc/x", ["a"]), ("/abs/x", ["b"]), ("x_2", ["c"]), ("..", ["d"])],
+        stream,
+        "zip"
+    )
+    assert zipfile.ZipFile(stream).namelist() == ["x.pdf", "x_2.pdf", "x_2_2.pdf", "worksheet_4.pdf"]
+    assert bundle_name("C:\\evil\\name") == "name"
@@ -0,0 +1,73 @@
+"""
+Tests for session handles and expiry of evicted values.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("streamlit")
+
+import session_manager  # noqa: E402
+import session_store  # noqa: E402
+
+
+class FakeSessionState(dict):
+    """Stand-in for st.session_state outside a running Streamlit script."""
+
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+class FakeStreamlit:
+    def __init__(self):
+        self.session_state = FakeSessionState()
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    monkeypatch.setattr(session_manager, "st", FakeStreamlit())
+    monkeypatch.setattr(session_store, "_entries", session_store.OrderedDict())
+    monkeypatch.setattr(session_store, "_session_bytes", {})
+    monkeypatch.setattr(session_store, "_session_seen", {})
+    monkeypatch.setattr(session_store, "_total_bytes", 0)
+    monkeypatch.setattr(session_store, "SESSION_QUOTA_BYTES", 3000)
+    monkeypatch.setattr(session_store, "REPORT_INTERVAL", 0)
+
+
+def test_never_stored_is_not_expired():
+    assert session_manager.load("solve_answer") is None
+    assert not session_manager.expired("solve_answer")
+
+
+def test_evicted_value_is_expired_until_forgotten():
+    session_manager.store("solve_answer", "Final Answer: 4")
+    session_store.discard(session_manager.st.session_state.handles["solve_answer"])
+
+    assert session_manager.load("solve_answer") is None
+    assert session_manager.expired("solve_answer")
+    # Stays expired across reruns
+    assert session_manager.load("solve_answer") is None
+    assert session_manager.expired("solve_answer")
+
+    session_manager.forget("solve_answer")
+    assert not session_manager.expired("solve_answer")
+
+
+def test_storing_again_clears_expiry():
+    session_manager.store("worksheet", "old")
+    session_store.discard(session_manager.st.session_state.handles["worksheet"])
+    session_manager.load("worksheet")
+    session_manager.store_json("worksheet", {"sections": ["new"]})
+
+    assert not session_manager.expired("worksheet")
+    assert session_manager.load_json("worksheet") == {"sections": ["new"]}
+
+
+def test_value_over_quota_is_expired():
+    session_manager.store("solve_answer", os.urandom(session_store.SESSION_QUOTA_BYTES + 1))
+
+    assert session_manager.load("solve_answer") is None
+    assert session_manager.expired("solve_answer")
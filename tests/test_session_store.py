@@ -0,0 +1,79 @@
+"""
+Tests for session payload eviction and expiry.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import session_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_store(monkeypatch):
+    monkeypatch.setattr(session_store, "_entries", session_store.OrderedDict())
+    monkeypatch.setattr(session_store, "_session_bytes", {})
+    monkeypatch.setattr(session_store, "_session_seen", {})
+    monkeypatch.setattr(session_store, "_total_bytes", 0)
+    monkeypatch.setattr(session_store, "SESSION_QUOTA_BYTES", 3000)
+    monkeypatch.setattr(session_store, "MAX_STORE_BYTES", 5000)
+    monkeypatch.setattr(session_store, "REPORT_INTERVAL", 0)
+
+
+def payload(size: int) -> bytes:
+    # Random bytes do not compress, so the stored size is the payload size
+    return os.urandom(size)
+
+
+def test_round_trip_text_and_bytes():
+    text = "Final Answer: 4\n" * 100
+    text_handle = session_store.put("a", text)
+    bytes_handle = session_store.put("a", b"%PDF-1.4")
+    assert session_store.get(text_handle) == text
+    assert session_store.get(bytes_handle) == b"%PDF-1.4"
+    assert session_store.get(None) is None
+
+
+def test_session_quota_evicts_recomputable_payloads_first():
+    answer = session_store.put("a", payload(800))
+    old_pdf = session_store.put("a", payload(1000), recomputable=True)
+    newer_answer = session_store.put("a", payload(800))
+    new_pdf = session_store.put("a", payload(1000), recomputable=True)
+
+    assert session_store.get(old_pdf) is None
+    assert session_store.get(answer) is not None
+    assert session_store.get(newer_answer) is not None
+    assert session_store.get(new_pdf) is not None
+
+
+def test_global_limit_evicts_recomputable_payloads_first():
+    answer = session_store.put("a", payload(1500))
+    pdf = session_store.put("a", payload(1000), recomputable=True)
+    other = session_store.put("b", payload(2500))
+    newest = session_store.put("c", payload(500))
+
+    assert session_store.get(pdf) is None
+    assert session_store.get(answer) is not None
+    assert session_store.get(other) is not None
+    assert session_store.get(newest) is not None
+    assert sum(session_store.usage().values()) <= session_store.MAX_STORE_BYTES
+
+
+def test_payload_over_quota_is_refused():
+    assert session_store.put("a", payload(session_store.SESSION_QUOTA_BYTES + 1)) is None
+    assert session_store.usage() == {}
+
+
+def test_drop_idle_sessions(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    idle = session_store.put("idle", payload(100))
+    now[0] += 50
+    active = session_store.put("active", payload(100))
+
+    assert session_store.drop_idle_sessions(max_idle=40) == 1
+    assert session_store.get(idle) is None
+    assert session_store.get(active) is not None
+    assert session_store.usage() == {"active": 100}
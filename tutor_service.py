@@ -0,0 +1,443 @@
+import os
+import re
+import json
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional
+from latexConvertor import convert_latex_document, process_latex_content
+from pdf_generation import create_pdf, create_worksheet_pdf, write_worksheet_bundle
+import image_assets
+import model_router
+import uuid
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Chapter corpus locations, keyed by UI language
+CHAPTER_PATHS = {
+    "English": os.path.join("Class10English", "engChapter{chapter}.json"),
+    "Hindi": os.path.join("Class10Hindi", "hindichapter{chapter}.json"),
+}
+
+# Language-specific difficulty options shown in the UI
+DIFFICULTY_OPTIONS = {
+    "English": {
+        "labels": ["Same Level", "Harder", "Most Hard"],
+        "descriptions": ["Similar to original", "More challenging", "Much more challenging"]
+    },
+    "Hindi": {
+        "labels": ["समान स्तर", "कठिन", "सबसे कठिन"],
+        "descriptions": ["मूल प्रश्न के समान", "अधिक चुनौतीपूर्ण", "बहुत अधिक चुनौतीपूर्ण"]
+    }
+}
+
+# Question type mappings
+QUESTION_TYPE_MAP = {
+    "Same as Original": {
+        "Hindi": "मूल प्रश्न के समान",
+        "English": "Same as Original"
+    },
+    "Multiple Choice Questions": {
+        "Hindi": "बहुविकल्पीय प्रश्न",
+        "English": "Multiple Choice Questions"
+    },
+    "Fill in the Blanks": {
+        "Hindi": "रिक्त स्थान भरें",
+        "English": "Fill in the Blanks"
+    },
+    "Short Answer Type": {
+        "Hindi": "लघु उत्तरीय प्रश्न",
+        "English": "Short Answer Type"
+    },
+    "True/False": {
+        "Hindi": "सही/गलत",
+        "English": "True/False"
+    }
+}
+
+# Difficulty mapping for prompt generation
+DIFFICULTY_MAP = {
+    "Same Level": {"Hindi": "समान स्तर", "English": "Same Level"},
+    "Harder": {"Hindi": "कठिन", "English": "Harder"},
+    "Most Hard": {"Hindi": "सबसे कठिन", "English": "Most Hard"},
+    "समान स्तर": {"Hindi": "समान स्तर", "English": "Same Level"},
+    "कठिन": {"Hindi": "कठिन", "English": "Harder"},
+    "सबसे कठिन": {"Hindi": "सबसे कठिन", "English": "Most Hard"}
+}
+
+# Start of each question-solution pair in a solve answer
+QUESTION_MARKER = re.compile(r'(?=\*\*(?:Question|प्रश्न)\s*\d+\s*:?\s*\*\*)')
+
+SOLVE_SYSTEM_MESSAGE = """You are an experienced mathematics teacher. Solve the questions given, following these guidelines:
+    1. Include step-by-step solutions
+    2. Use LaTeX formatting for mathematical expressions (use $ for inline math and $$ for display math)
+    3. Show complete solution with final answers written as Final Answer: <answer>
+    4. Ensure that the last step, with the final value of the variable, is displayed at the end of the solution. The value should be in numbers, do not write an unsolved equation as the final value
+    5. Whenever showing the solution, first explain the concept that is being tested by the question in simple terms 
+    6. While explaining a concept , besides giving an example, also give a counter-example at the beginning . That always makes things clear
+    7. Any time you write a solution,  explain the solution in a way that is extremely easy to understand by children struggling with complex technical terms 
+    8. Whenever trying to explain in simple terms : 1. use colloquial local language terms and try to avoid technical terms . When using technical terms , re explain those terms in local colloquial terms 
+    9. Recheck the solution for any mistakes
+    10. Start each question-solution pair with '**Question N:**' where N is the question number, and reproduce the question in bold letters before following it up with detailed solution"""
+
+
+@lru_cache(maxsize=1)
+def get_client():
+    """
+    Returns a shared OpenAI client.
+
+    openai and dotenv are imported here rather than at module level so that
+    importing this module stays cheap for pages that never call the model.
+    """
+    from dotenv import load_dotenv
+    from openai import OpenAI
+    load_dotenv()
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def load_chapter(language: str, chapter: int) -> Optional[dict]:
+    """
+    Loads the exercise data for a chapter from the textbook corpus.
+
+    Args:
+        language: "English" or "Hindi"
+        chapter: Chapter number
+
+    Returns:
+        Parsed chapter JSON, or None if the chapter does not exist
+    """
+    template = CHAPTER_PATHS.get(language)
+    if template is None:
+        return None
+    json_path = os.path.join(BASE_DIR, template.format(chapter=chapter))
+    if not os.path.exists(json_path):
+        return None
+    with open(json_path, 'r') as file:
+        return json.load(file)
+
+
+def user_content(prompt: str, figures: List[tuple]):
+    """
+    Builds the user message content, attaching figures as images when any are available.
+
+    Args:
+        prompt: Text prompt
+        figures: (caption, figure key) pairs
+
+    Returns:
+        The prompt string, or a list of content parts with the figures appended
+    """
+    parts = []
+    for caption, key in figures:
+        data_url = image_assets.figure_data_url(key)
+        if data_url:
+            parts.append({"type": "text", "text": caption})
+            parts.append({"type": "image_url", "image_url": {"url": data_url}})
+    if not parts:
+        return prompt
+    return [{"type": "text", "text": prompt}] + parts
+
+
+def question_text(index: int, question: dict, sub_index: Optional[int] = None) -> str:
+    """
+    Returns the text a question (or one of its sub-questions) is selected and solved by.
+
+    Args:
+        index: Zero-based position of the question in its exercise
+        question: Question entry from the chapter file
+        sub_index: Zero-based position of the sub-question, if any
+    """
+    text = f"Question {index + 1}: {question['question']}"
+    if sub_index is None:
+        return text
+    return f"{text} {index + 1}.{sub_index + 1} {question['sub_questions'][sub_index]}"
+
+
+def build_solve_messages(questions: List[str], language: str,
+                         figures: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """
+    Builds the chat messages for solving the selected questions.
+
+    Args:
+        questions: Selected question texts, in order
+        language: Language the solutions should be written in
+        figures: Figure keys of the questions that refer to a figure
+
+    Returns:
+        List of chat messages for the completion API
+    """
+    figures = figures or {}
+    prompt = f"Please solve the following mathematics questions in {language} step by step:\n\n"
+    for i, question in enumerate(questions, 1):
+        prompt += f"Question {i}: {question}\n"
+
+    question_figures = [
+        (f"Figure for Question {i}:", figures[question])
+        for i, question in enumerate(questions, 1)
+        if question in figures
+    ]
+    return [
+        {"role": "system", "content": SOLVE_SYSTEM_MESSAGE},
+        {"role": "user", "content": user_content(prompt, question_figures)}
+    ]
+
+
+def build_generate_messages(question: str, count: int, language: str,
+                            selected_difficulty: str, question_type: str,
+                            figure: Optional[str] = None) -> List[Dict]:
+    """
+    Builds the chat messages for generating variations of one question.
+
+    Args:
+        question: Example question text
+        count: Number of variations to generate
+        language: Language the variations should be written in
+        selected_difficulty: Difficulty label, in either language
+        question_type: Key of QUESTION_TYPE_MAP
+        figure: Figure key if the question refers to a figure
+
+    Returns:
+        List of chat messages for the completion API
+    """
+    system_messages = {
+                "Hindi": f"""आप एक अनुभवी गणित शिक्षक हैं। दिए गए उदाहरणों की तरह प्रश्न बनाएं और इन नियमों का पालन करें:
+                1.	गणितीय अभिव्यक्तियों को लिखने के लिए LaTeX फॉर्मेटिंग का उपयोग करें (इनलाइन गणित के लिए $ और बड़े गणित के लिए $$ का उपयोग करें)।
+	            2.	कठिनाई स्तर ‘{selected_difficulty}’ पर सेट करें। अगर कठिनाई स्तर बदलना हो, तो संख्या या स्थिति को और जटिल बनाएं, लेकिन वही गणितीय अवधारणा बनाए रखें।
+                3. प्रश्न का प्रारूप निम्नलिखित होना चाहिए:
+                    यदि प्रारूप '{QUESTION_TYPE_MAP[question_type]["Hindi"]}' है:
+                        - यदि "मूल प्रश्न के समान" चुना गया है, तो मूल प्रश्न का प्रारूप बनाए रखें
+                        - यदि "बहुविकल्पीय प्रश्न" चुना गया है, तो प्रत्येक प्रश्न में चार विकल्प दें (a, b, c, d)
+                        - यदि "रिक्त स्थान भरें" चुना गया है, तो वाक्य में रिक्त स्थान (_____) छोड़ें
+                        - यदि "लघु उत्तरीय प्रश्न" चुना गया है, तो प्रश्न को छोटे उत्तर वाले प्रश्न में बदलें
+                        - यदि "सही/गलत" चुना गया है, तो कथन बनाएं जिनका उत्तर सही या गलत में दिया जा सके
+                    प्रत्येक प्रारूप के लिए विशिष्ट निर्देश:
+                    1. बहुविकल्पीय प्रश्न: 
+                        - चारों विकल्प तार्किक और प्रासंगिक होने चाहिए
+                        - एक स्पष्ट सही उत्तर होना चाहिए
+                        - गलत विकल्प सामान्य गलतियों पर आधारित होने चाहिए
+                    2. रिक्त स्थान:
+                        - रिक्त स्थान महत्वपूर्ण गणितीय अवधारणा के लिए होना चाहिए
+                        - एक से अधिक रिक्त स्थान हो सकते हैं
+                        - स्पष्ट संदर्भ प्रदान करें
+                    3. लघु उत्तरीय:
+                        - प्रश्न विशिष्ट और संक्षिप्त होना चाहिए
+                        - उत्तर 2-3 वाक्यों में दिया जा सकना चाहिए
+                    4. सही/गलत:
+                        - कथन स्पष्ट और असंदिग्ध होना चाहिए
+                        - गणितीय अवधारणाओं पर आधारित होना चाहिए
+	            4.	प्रश्न देने के बाद उसका चरण-दर-चरण समाधान भी लिखें।
+	            5.	समाधान बनाते समय पूरा हल दिखाएं और अंतिम उत्तर को “अंतिम उत्तर: <उत्तर>” के रूप में लिखें।
+	            6.	ध्यान रखें कि समाधान का आखिरी कदम उस मान को दिखाए जो अंतिम उत्तर है। अंतिम उत्तर में संख्या होनी चाहिए, किसी अनसुलझे समीकरण के रूप में न हो।
+	            7.	समाधान में सबसे पहले उस अवधारणा को सरल शब्दों में समझाएं जो प्रश्न में पूछी जा रही है।
+	            8.	किसी अवधारणा को समझाते समय, पहले एक उदाहरण दें और उसके बाद एक उल्टा उदाहरण भी दें। इससे बात और साफ हो जाती है।
+	            9.	जब भी कोई समाधान लिखें, तो उसे आसान शब्दों में इस तरह समझाएं कि वह उन बच्चों को भी समझ में आ सके जिन्हें कठिन तकनीकी शब्दों में परेशानी होती है।
+	            10.	समाधान को सरल बनाने के लिए स्थानीय आम बोलचाल के शब्दों का उपयोग करें और तकनीकी शब्दों से बचें। यदि तकनीकी शब्द आवश्यक हों, तो उन्हें भी आसान भाषा में समझाएं।
+	            11.	किसी भी गलती के लिए समाधान की पुनः जांच करें।
+	            12.	हर प्रश्न-समाधान जोड़ी को ‘प्रश्न N:’ से शुरू करें, जहाँ N प्रश्न की संख्या है। प्रश्न को मोटे अक्षरों में लिखें और फिर पूरा समाधान दें।
+	            13.	सभी प्रश्न और उत्तर हिंदी में होने चाहिए।""",
+                
+                "English": f"""You are an experienced mathematics teacher. Generate questions similar to the given examples, following these guidelines:
+                1. Use LaTeX formatting for mathematical expressions (use $ for inline math and $$ for display math)
+                2. Set difficulty level to '{selected_difficulty}' - if changing from original, use more complex numbers or situations while maintaining the same mathematical concept
+                3. The question format should be as follows:
+                    If format is '{QUESTION_TYPE_MAP[question_type]["English"]}':
+                        - If "Same as Original" is selected, maintain the original question format
+                        - If "Multiple Choice Questions" is selected, provide four options (a, b, c, d) for each question
+                        - If "Fill in the Blanks" is selected, create sentences with blanks (_____)
+                        - If "Short Answer Type" is selected, convert to questions requiring brief answers
+                        - If "True/False" is selected, create statements that can be judged as true or false
+                    Specific instructions for each format:
+                    1. Multiple Choice Questions:
+                        - All four options should be logical and relevant
+                        - There should be one clear correct answer
+                        - Wrong options should be based on common misconceptions
+                    2. Fill in the Blanks:
+                        - Blanks should test key mathematical concepts
+                        - Can have multiple blanks
+                        - Provide clear context
+                    3. Short Answer:
+                        - Questions should be specific and concise
+                        - Answer should be possible in 2-3 sentences
+                    4. True/False:
+                        - Statements should be clear and unambiguous
+                        - Should be based on mathematical concepts
+                4. After providing the question, also generate its step-by-step solution 
+                5. When generating solutions, show complete solution with final answers written as Final Answer: <answer>
+                6. Ensure that the last step, with the final value of the variable, is displayed at the end of the solution. The value should be in numbers, do not write an unsolved equation as the final value
+                7. Whenever showing the solution, first explain the concept that is being tested by the question in simple terms 
+                8. While explaining a concept , besides giving an example, also give a counter-example at the beginning . That always makes things clear
+                9. Any time you write a solution,  explain the solution in a way that is extremely easy to understand by children struggling with complex technical terms 
+                10. Whenever trying to explain in simple terms : 1. use colloquial local language terms and try to avoid technical terms . When using technical terms , re explain those terms in local colloquial terms 
+                11. Recheck the solution for any mistakes
+                12. Start each question-solution pair with '**Question N:**' where N is the question number, and reproduce the question in bold letters before following it up with detailed solution
+                13. All questions and answers should be in English"""
+            }
+
+    prompts = {
+                        "Hindi": f"""इस उदाहरण प्रश्न के आधार पर:
+उदाहरण: {question}: {count} नए {DIFFICULTY_MAP[selected_difficulty]["Hindi"]} स्तर के प्रश्नों को निर्दिष्ट प्रारूप '{QUESTION_TYPE_MAP[question_type]["Hindi"]}' में बनाएं।
+यदि मूल प्रश्न से कठिनाई स्तर बदल रहा है, तो समान गणितीय अवधारणा का उपयोग करते हुए अधिक जटिल संख्याएँ या परिस्थितियाँ प्रयोग करें।
+उत्तर को इस प्रकार संरचित करें:
+प्रश्न:
+1. [पहला प्रश्न]
+2. [दूसरा प्रश्न]
+...
+उत्तर:
+1. [पहले प्रश्न के लिए आसान भाषा में हर कदम का विस्तार से हल, जिसमें अवधारणाओं को समझाने के लिए उदाहरण और उल्टा उदाहरण भी दिए गए हों।]
+2. [दूसरे प्रश्न के लिए आसान भाषा में हर कदम का विस्तार से हल, जिसमें अवधारणाओं को समझाने के लिए उदाहरण और उल्टा उदाहरण भी दिए गए हों।]
+...""",
+
+                        "English": f"""Based on this example question:
+Example: {question}:Generate {count} new {DIFFICULTY_MAP[selected_difficulty]["English"]} level variations.Create the questions in the specified format '{QUESTION_TYPE_MAP[question_type]["English"]}.
+If changing difficulty from original, use more complex numbers or situations while maintaining the same mathematical concept.
+Structure the response as follows:
+Questions:
+1. [First question]
+2. [Second question]
+...
+Answers:
+1. [Step-by-step detailed solution in simplest possible language alongwith explanation of underlying concepts using both examples and counter-examples for first question]
+2. [Step-by-step detailed solution in simplest possible language alongwith explanation of underlying concepts using both examples and counter-examples for second question]
+..."""
+                    }
+
+    return [
+        {"role": "system", "content": system_messages[language]},
+        {"role": "user", "content": user_content(prompts[language], [("Figure:", figure)] if figure else [])}
+    ]
+
+
+def complete(messages: List[Dict], temperature: float = 0.7, task: str = "solve",
+             question_type: Optional[str] = None, difficulty: Optional[str] = None) -> str:
+    """
+    Runs a chat completion on the routed model and returns the answer text.
+
+    Args:
+        messages: Chat messages for the completion API
+        temperature: Sampling temperature
+        task: "solve" or "generate", used for model routing
+        question_type: Key of QUESTION_TYPE_MAP, used for model routing
+        difficulty: Difficulty label, used for model routing
+
+    Returns:
+        Raw answer text from the model
+    """
+    def call(model: str, messages: List[Dict], timeout: float) -> str:
+        # No client-side retries: a failed attempt falls back to the next routed model instead
+        client = get_client().with_options(timeout=timeout, max_retries=0)
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    return model_router.complete_with_fallback(call, messages, task, question_type, difficulty)
+
+
+def solve_questions(questions: List[str], language: str,
+                    figures: Optional[Dict[str, str]] = None) -> str:
+    """Solves the given questions and returns the raw model answer."""
+    return complete(build_solve_messages(questions, language, figures), task="solve")
+
+
+def generate_variations(question: str, count: int, language: str,
+                        selected_difficulty: str, question_type: str,
+                        figure: Optional[str] = None) -> str:
+    """Generates variations of one question and returns the raw model answer."""
+    return complete(
+        build_generate_messages(question, count, language, selected_difficulty, question_type, figure),
+        task="generate",
+        question_type=question_type,
+        difficulty=selected_difficulty
+    )
+
+
+def prepare_content(raw_content: str) -> Dict[str, str]:
+    """
+    Runs the LaTeX processing steps on raw model output.
+
+    Args:
+        raw_content: Raw answer text from the model
+
+    Returns:
+        Dict with "processed" markdown for display and "formatted" plain text for the PDF
+    """
+    processed_content = process_latex_content(raw_content)
+    return {
+        "processed": processed_content,
+        "formatted": convert_latex_document(processed_content)
+    }
+
+
+def render_pdf(text: str) -> bytes:
+    """Renders formatted text to PDF bytes."""
+    return create_pdf(text, f"questions_and_answers_{uuid.uuid4().hex}.pdf")
+
+
+def split_solution_sections(raw_content: str) -> List[str]:
+    """
+    Splits a solve answer into one section per question-solution pair.
+
+    Any text before the first '**Question N:**' marker stays with the first section.
+    """
+    parts = [part for part in QUESTION_MARKER.split(raw_content) if part.strip()]
+    if len(parts) > 1 and not QUESTION_MARKER.match(parts[0]):
+        parts[1] = parts[0] + parts[1]
+        parts = parts[1:]
+    return parts or [raw_content]
+
+
+@lru_cache(maxsize=256)
+def format_section(raw_section: str) -> str:
+    """Converts one raw worksheet section to the plain text used in the PDF."""
+    return prepare_content(raw_section)["formatted"]
+
+
+def worksheet_sections(sections: List[str], figures: Optional[List[Optional[List[str]]]] = None) -> List[str]:
+    """
+    Formats raw sections for the PDF and appends each section's figures.
+
+    Args:
+        sections: Raw per-question sections
+        figures: Figure keys for each section, aligned with sections
+    """
+    figures = figures or []
+    formatted = []
+    for i, section in enumerate(sections):
+        section_figures = figures[i] if i < len(figures) and figures[i] else []
+        formatted.append(format_section(section) + "".join(image_assets.figure_markdown(key) for key in section_figures))
+    return formatted
+
+
+def render_worksheet(sections: List[str], figures: Optional[List[Optional[List[str]]]] = None) -> bytes:
+    """
+    Renders a worksheet PDF from raw per-question sections.
+
+    Sections are formatted and rendered individually and cached by content,
+    so re-rendering a worksheet after one question changes only does the
+    work for that question.
+
+    Args:
+        sections: Raw per-question sections
+        figures: Figure keys for each section, aligned with sections
+    """
+    return create_worksheet_pdf(worksheet_sections(sections, figures), root=image_assets.pdf_root())
+
+
+def render_worksheet_bundle(worksheets: List[Dict], stream: BinaryIO, fmt: str = "zip"):
+    """
+    Writes several worksheets to a stream as one combined PDF or a ZIP archive.
+
+    Args:
+        worksheets: Dicts with "name", raw "sections" and optionally per-section "figures"
+        stream: Writable binary stream
+        fmt: "pdf" or "zip"
+    """
+    write_worksheet_bundle(
+        [
+            (worksheet.get("name"), worksheet_sections(worksheet["sections"], worksheet.get("figures")))
+            for worksheet in worksheets
+        ],
+        stream,
+        fmt,
+        root=image_assets.pdf_root()
+    )